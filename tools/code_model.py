@@ -0,0 +1,241 @@
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+from typing import TypeVar
+
+import numpy as np
+
+from function import Function, all_functions, compare, group_words
+from info.game_info import GameInfo
+from info.info_entry import CodeMode
+from rom import Rom
+from thumb import ThumbInstruct, build_decode_table
+
+
+CODE_MODEL_VERSION = 1
+
+# Per-function lists stored as one flat array plus offsets
+LIST_FIELDS = (
+    "instructs", "branches", "data_pool", "jump_tables", "jump_words",
+    "bl_addrs", "bl_targets"
+)
+
+
+class FuncInfo:
+    """
+    A function from a CodeModel. Has the same attributes as Function that
+    whole-ROM analyses use, without walking the function again.
+    """
+
+    __slots__ = (
+        "rom", "start_addr", "end_addr", "instruct_addrs", "branches",
+        "data_pool", "jump_tables", "jump_words", "bls"
+    )
+
+    def __init__(self, rom: Rom, start_addr: int, end_addr: int, lists: dict[str, list[int]]):
+        self.rom = rom
+        self.start_addr = start_addr
+        self.end_addr = end_addr
+        self.instruct_addrs: list[int] = lists["instructs"]
+        self.branches: set[int] = set(lists["branches"])
+        self.data_pool: set[int] = set(lists["data_pool"])
+        self.jump_tables: set[int] = set(lists["jump_tables"])
+        self.jump_words: set[int] = set(lists["jump_words"])
+        # (addr, target) of each bl
+        self.bls: list[tuple[int, int]] = list(zip(lists["bl_addrs"], lists["bl_targets"]))
+
+    def get_instructions(self) -> list[ThumbInstruct]:
+        return [ThumbInstruct(self.rom, a) for a in self.instruct_addrs]
+
+    def get_jump_tables(self) -> set[int]:
+        return set(self.jump_words)
+
+    def get_data_pools(self) -> list[tuple[int, int]]:
+        return group_words(self.data_pool | self.jump_words)
+
+
+class CodeModel:
+    """
+    Function boundaries, instruction addresses, branch targets, literal
+    pools and jump tables for every THUMB function in a ROM, as found by
+    all_functions. Computed once per ROM and cached on disk.
+    """
+
+    def __init__(self, rom: Rom, arrays: dict[str, np.ndarray]):
+        self.rom = rom
+        self.starts = arrays["starts"]
+        self.ends = arrays["ends"]
+        self.arrays = arrays
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, i: int) -> FuncInfo:
+        lists = {}
+        for field in LIST_FIELDS:
+            offs = self.arrays[field + "_offs"]
+            vals = self.arrays[field]
+            lists[field] = vals[offs[i]:offs[i + 1]].tolist()
+        return FuncInfo(self.rom, int(self.starts[i]), int(self.ends[i]), lists)
+
+    def functions(self) -> Iterator[FuncInfo]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def func_at(self, addr: int) -> FuncInfo:
+        """Returns the function starting at addr, or None."""
+        i = np.searchsorted(self.starts, addr)
+        if i < len(self) and self.starts[i] == addr:
+            return self[i]
+        return None
+
+    @classmethod
+    def build(cls, rom: Rom) -> "CodeModel":
+        build_decode_table()
+        starts = []
+        ends = []
+        lists: dict[str, list[list[int]]] = {f: [] for f in LIST_FIELDS}
+        for func in all_functions(rom):
+            starts.append(func.start_addr)
+            ends.append(func.end_addr)
+            addrs = sorted(func.instructs.keys())
+            bls = func.get_bls()
+            lists["instructs"].append(addrs)
+            lists["branches"].append(sorted(func.branches))
+            lists["data_pool"].append(sorted(func.data_pool))
+            lists["jump_tables"].append(sorted(func.jump_tables))
+            lists["jump_words"].append(sorted(func.get_jump_tables()))
+            lists["bl_addrs"].append([a for a, _ in bls])
+            lists["bl_targets"].append([t for _, t in bls])
+        arrays = {
+            "starts": np.array(starts, dtype=np.uint32),
+            "ends": np.array(ends, dtype=np.uint32)
+        }
+        for field, per_func in lists.items():
+            offs = np.zeros(len(per_func) + 1, dtype=np.int64)
+            offs[1:] = np.cumsum([len(l) for l in per_func])
+            flat = [v for l in per_func for v in l]
+            # bl targets can fall outside the rom
+            dtype = np.int64 if field == "bl_targets" else np.uint32
+            arrays[field] = np.array(flat, dtype=dtype)
+            arrays[field + "_offs"] = offs
+        return cls(rom, arrays)
+
+    @classmethod
+    def load(cls, rom: Rom, path: str) -> "CodeModel":
+        with np.load(path) as f:
+            if int(f["version"]) != CODE_MODEL_VERSION:
+                raise ValueError("Outdated code model")
+            return cls(rom, {k: f[k] for k in f.files if k != "version"})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=CODE_MODEL_VERSION, **self.arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def for_rom(cls, rom: Rom, use_cache: bool = True) -> "CodeModel":
+        """Loads the code model for the ROM from the cache, building it if needed."""
+        path = rom.cache_path("code", ".npz")
+        if use_cache and os.path.isfile(path):
+            try:
+                return cls.load(rom, path)
+            except (OSError, ValueError, KeyError):
+                pass
+        model = cls.build(rom)
+        if use_cache:
+            model.save(path)
+        return model
+
+
+T = TypeVar("T")
+
+_worker_rom: Rom = None
+
+
+def _init_worker(rom_path: str) -> None:
+    global _worker_rom
+    _worker_rom = Rom(rom_path, use_mmap=True)
+
+
+def _map_chunk(fn: Callable[[Function], T], addrs: list[int]) -> list[T]:
+    return [fn(Function(_worker_rom, addr)) for addr in addrs]
+
+
+def function_starts(rom: Rom) -> list[int]:
+    """
+    Returns the start address of every THUMB function in the ROM,
+    taken from the cached code model.
+    """
+    return CodeModel.for_rom(rom).starts.tolist()
+
+
+def map_functions(
+    rom: Rom,
+    fn: Callable[[Function], T],
+    processes: int = None,
+    chunk_size: int = 256
+) -> list[T]:
+    """
+    Applies fn to every THUMB function in the ROM and returns the results
+    in address order. Function boundaries are found first, then each
+    function is decoded and analyzed independently in a pool of worker
+    processes. Workers map the ROM file read-only, so they share its pages
+    instead of each holding a copy; a ROM modified in memory can only be
+    mapped with processes=1. Analyses that only need what the code model
+    stores should iterate CodeModel.for_rom(rom).functions() instead, since
+    this decodes every function again. fn must be defined at module level
+    (or be a partial of such a function) so it can be sent to workers.
+    """
+    starts = function_starts(rom)
+    if processes == 1:
+        return [fn(Function(rom, addr)) for addr in starts]
+    # Workers read the file, so it must still hold the image in memory
+    with Rom(rom.path, use_mmap=True) as on_disk:
+        if on_disk.sha1() != rom.sha1():
+            raise ValueError(f"{rom.path} differs from the ROM being analyzed")
+    chunks = [starts[i:i + chunk_size] for i in range(0, len(starts), chunk_size)]
+    results: list[T] = []
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(rom.path,)
+    ) as executor:
+        for chunk_results in executor.map(partial(_map_chunk, fn), chunks):
+            results += chunk_results
+    return results
+
+
+def compare_all(rom_a: Rom, rom_b: Rom) -> None:
+    region_a = rom_a.region
+    region_b = rom_b.region
+    assert rom_a.game == rom_b.game and region_a != region_b
+    model_a = CodeModel.for_rom(rom_a)
+    model_b = CodeModel.for_rom(rom_b)
+    info = GameInfo(rom_a.game)
+    for entry in info.code:
+        if entry.mode == CodeMode.Arm:
+            continue
+        addrs = entry.addr
+        if not isinstance(addrs, dict):
+            addrs = {region_a: addrs, region_b: addrs}
+        addr_a = addrs.get(region_a)
+        addr_b = addrs.get(region_b)
+        msg = None
+        if addr_a is not None and addr_b is not None:
+            func_a = model_a.func_at(addr_a) or Function(rom_a, addr_a)
+            func_b = model_b.func_at(addr_b) or Function(rom_b, addr_b)
+            diff = compare(func_a, func_b)
+            if not diff.is_same():
+                msg = diff.name
+        elif addr_a is not None:
+            msg = f"{region_a} only"
+        elif addr_b is not None:
+            msg = f"{region_b} only"
+        if msg is not None:
+            addr_str_a = "" if addr_a is None else f"{addr_a:X}"
+            addr_str_b = "" if addr_b is None else f"{addr_b:X}"
+            print("\t".join([entry.name, msg, addr_str_a, addr_str_b]))
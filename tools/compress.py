@@ -1,8 +1,19 @@
 import argparse
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum, auto
+from functools import partial
+import hashlib
 import heapq
+import os
+import time
+import tracemalloc
+
+import numpy as np
 
 import argparse_utils as apu
+from constants import CACHE_PATH
+from rom import Rom
 
 
 MIN_MATCH_SIZE = 3
@@ -20,12 +31,9 @@ class LzCompMethod(Enum):
 
 def decomp_rle(input: bytes, idx: int) -> tuple[bytes, int]:
     src_start = idx
-    passes = []
-    half = None
+    passes = (bytearray(), bytearray())
     # For each pass
-    for p in range(2):
-        if p == 1:
-            half = len(passes)
+    for out in passes:
         num_bytes = input[idx]
         idx += 1
         flag = 0x80 if num_bytes == 1 else 0x8000
@@ -44,41 +52,55 @@ def decomp_rle(input: bytes, idx: int) -> tuple[bytes, int]:
             if (amount & flag) != 0:
                 # Compressed
                 amount %= flag
-                val = input[idx]
+                out += bytes((input[idx],)) * amount
                 idx += 1
-                while amount > 0:
-                    passes.append(val)
-                    amount -= 1
             else:
                 # Uncompressed
-                while amount > 0:
-                    passes.append(input[idx])
-                    idx +=1
-                    amount -=1
-    
+                if idx + amount > len(input):
+                    raise IndexError("RLE data past end of input")
+                out += input[idx:idx + amount]
+                idx += amount
+
     # Each pass must be equal length
-    if len(passes) != half * 2:
-        raise ValueError()
-    
+    if len(passes[0]) != len(passes[1]):
+        raise ValueError("RLE passes have different lengths")
+
     # Combine passes to get output
-    out_list = bytearray()
-    for i in range(half):
-        out_list.append(passes[i])
-        out_list.append(passes[half + i])
-    
+    output = bytearray(len(passes[0]) * 2)
+    output[0::2] = passes[0]
+    output[1::2] = passes[1]
+
     # Return bytes and compressed size
     comp_size = idx - src_start
-    return bytes(out_list), comp_size
+    return bytes(output), comp_size
 
 
 def decomp_lz77(input: bytes, idx: int) -> tuple[bytes, int]:
+    chunks = iter_decomp_lz77(input, idx, None)
+    try:
+        while True:
+            output = next(chunks)
+    except StopIteration as stop:
+        return output, stop.value
+
+
+def iter_decomp_lz77(
+    input: bytes,
+    idx: int,
+    chunk_size: int | None = 0x8000
+) -> Generator[bytes, None, int]:
+    """
+    LZ77 decompresses data, yielding the output in chunks of at least
+    chunk_size bytes (except the last) while only keeping the window that
+    back-references can reach. The generator returns the compressed size.
+    If chunk_size is None, the whole output is yielded at once.
+    """
     # Check for 0x10 flag
     if input[idx] != 0x10:
         raise ValueError("Missing 0x10 flag")
 
     # Get length of decompressed data
     remain = input[idx + 1] | (input[idx + 2] << 8) | (input[idx + 3] << 16)
-    output = bytearray([0] * remain)
 
     # Check for valid data size
     if remain == 0:
@@ -86,37 +108,56 @@ def decomp_lz77(input: bytes, idx: int) -> tuple[bytes, int]:
 
     start = idx
     idx += 4
-    dst = 0
+    output = bytearray()
+    # Number of bytes already yielded and dropped from output
+    done = 0
 
     # Decompress
     while (True):
         cflag = input[idx]
         idx += 1
 
-        for _ in range(8):
-            if (cflag & 0x80) == 0:
-                # Uncompressed
-                output[dst] = input[idx]
-                idx += 1
-                dst += 1
-                remain -= 1
-            else:
-                # Compressed
-                amount_to_copy = (input[idx] >> 4) + MIN_MATCH_SIZE
-                window = ((input[idx] & 0xF) << 8) + input[idx + 1] + MIN_WINDOW_SIZE
-                idx += 2
-                remain -= amount_to_copy
-                
-                for _ in range(amount_to_copy):
-                    output[dst] = output[dst - window]
-                    dst += 1
-
-            if remain <= 0:
-                if remain < 0:
-                    raise ValueError("Too many bytes copied at end")
-                comp_size = idx - start
-                return bytes(output), comp_size
-            cflag <<= 1
+        if cflag == 0 and remain > 8 and idx + 8 <= len(input):
+            # Uncompressed run
+            output += input[idx:idx + 8]
+            idx += 8
+            remain -= 8
+        else:
+            for _ in range(8):
+                if (cflag & 0x80) == 0:
+                    # Uncompressed
+                    output.append(input[idx])
+                    idx += 1
+                    remain -= 1
+                else:
+                    # Compressed
+                    amount_to_copy = (input[idx] >> 4) + MIN_MATCH_SIZE
+                    window = ((input[idx] & 0xF) << 8) + input[idx + 1] + MIN_WINDOW_SIZE
+                    idx += 2
+                    if amount_to_copy > remain:
+                        raise ValueError("Too many bytes copied at end")
+                    if window > done + len(output):
+                        raise ValueError("Window before start of data")
+                    remain -= amount_to_copy
+
+                    src = len(output) - window
+                    if window >= amount_to_copy:
+                        output += output[src:src + amount_to_copy]
+                    else:
+                        # Overlapping copy repeats the last window bytes
+                        repeats = amount_to_copy // window + 1
+                        output += (output[src:] * repeats)[:amount_to_copy]
+
+                if remain == 0:
+                    yield bytes(output)
+                    return idx - start
+                cflag <<= 1
+
+        if chunk_size is not None and len(output) >= chunk_size + MAX_WINDOW_SIZE:
+            cut = len(output) - MAX_WINDOW_SIZE
+            yield bytes(output[:cut])
+            del output[:cut]
+            done += cut
 
 
 def is_lz77(input: bytes, idx: int) -> int:
@@ -165,6 +206,26 @@ def is_lz77(input: bytes, idx: int) -> int:
             cflag <<= 1
 
 
+def decompress_any(rom: Rom, addr: int) -> tuple[bytes, int]:
+    """
+    Decompresses LZ77 or RLE data at addr, whichever is valid there.
+    Returns the decompressed bytes and compressed size.
+    """
+    flag = rom.data[addr]
+    if flag == 0x10:
+        try:
+            if is_lz77(rom.data, addr) > 0:
+                return decomp_lz77(rom.data, addr)
+        except IndexError:
+            pass
+    if flag == 1 or flag == 2:
+        try:
+            return decomp_rle(rom.data, addr)
+        except (IndexError, ValueError):
+            pass
+    raise ValueError(f"No compressed data at {addr:X}")
+
+
 def comp_lz77(input: bytes, method: LzCompMethod = LzCompMethod.GREEDY) -> bytes:
     if method == LzCompMethod.MATCHING or method == LzCompMethod.GREEDY:
         matching = method == LzCompMethod.MATCHING
@@ -173,6 +234,88 @@ def comp_lz77(input: bytes, method: LzCompMethod = LzCompMethod.GREEDY) -> bytes
         return _comp_lz77_optimal(input)
 
 
+def comp_lz77_many(
+    buffers: Iterable[bytes],
+    method: LzCompMethod = LzCompMethod.GREEDY,
+    processes: int = None,
+    cache_dir: str = os.path.join(CACHE_PATH, "lz77"),
+    verify: bool = False
+) -> list[bytes]:
+    """
+    LZ77 compresses each buffer, returning the outputs in the same order.
+    Outputs are cached on disk by the SHA-256 of the input and the method,
+    so unchanged buffers are never recompressed; pass cache_dir=None to
+    skip the cache. Buffers that miss the cache are compressed in a pool
+    of worker processes. If verify is set, every output (including cached
+    ones) must decompress back to its input, or ValueError is raised.
+    """
+    buffers = [bytes(buffer) for buffer in buffers]
+    outputs: list[bytes] = [None] * len(buffers)
+    # Cache key -> indexes of buffers with that content
+    pending: dict[str, list[int]] = {}
+
+    for i, buffer in enumerate(buffers):
+        key = f"{hashlib.sha256(buffer).hexdigest()}_{method.name.lower()}"
+        if key in pending:
+            pending[key].append(i)
+            continue
+        if cache_dir is not None:
+            output = _read_lz77_cache(cache_dir, key)
+            if output is not None and (not verify or _round_trips(buffer, output)):
+                outputs[i] = output
+                continue
+        pending[key] = [i]
+
+    keys = list(pending)
+    inputs = [buffers[pending[key][0]] for key in keys]
+    task = partial(_comp_lz77_task, method=method, verify=verify)
+
+    def store(results: Iterable[bytes]) -> None:
+        for key, output in zip(keys, results):
+            for i in pending[key]:
+                outputs[i] = output
+            if cache_dir is not None:
+                _write_lz77_cache(cache_dir, key, output)
+
+    if processes == 1 or len(inputs) <= 1:
+        store(map(task, inputs))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            store(executor.map(task, inputs))
+    return outputs
+
+
+def _comp_lz77_task(input: bytes, method: LzCompMethod, verify: bool) -> bytes:
+    output = comp_lz77(input, method)
+    if verify and not _round_trips(input, output):
+        raise ValueError(f"LZ77 {method.name} output does not decompress to its input")
+    return output
+
+
+def _round_trips(input: bytes, output: bytes) -> bool:
+    try:
+        return decomp_lz77(output, 0) == (input, len(output))
+    except (ValueError, IndexError):
+        return False
+
+
+def _read_lz77_cache(cache_dir: str, key: str) -> bytes | None:
+    try:
+        with open(os.path.join(cache_dir, key + ".lz"), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_lz77_cache(cache_dir: str, key: str, output: bytes) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ".lz")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(output)
+    os.replace(tmp_path, path)
+
+
 def _comp_lz77_greedy(input: bytes, matching: bool) -> bytes:
     """LZ77 compresses data by greedily selecting the longest match at each step."""
     # Assumes input stream starts at 0
@@ -215,7 +358,10 @@ def _comp_lz77_greedy(input: bytes, matching: bool) -> bytes:
     raise Exception("LZ77 compression error")
 
 
-def _comp_lz77_optimal(input: bytes) -> bytes:
+def _comp_lz77_optimal(
+    input: bytes,
+    find_best_path: Callable[[int, dict[int, tuple[int, int]]], list[int]] = None
+) -> bytes:
     """LZ77 compresses data by finding the optimal sequence of matches."""
     # Assumes input stream starts at 0
     length = len(input)
@@ -223,8 +369,10 @@ def _comp_lz77_optimal(input: bytes) -> bytes:
     flag_counter = 8
     flag_idx = -1
 
+    if find_best_path is None:
+        find_best_path = _find_best_path
     longest_matches = _find_longest_matches(input, False)
-    path = _find_best_path(length, longest_matches)
+    path = find_best_path(length, longest_matches)
 
     # Write start of data
     output = bytearray()
@@ -263,73 +411,135 @@ def _comp_lz77_optimal(input: bytes) -> bytes:
 
 def _find_longest_matches(input: bytes, matching: bool) -> dict[int, tuple[int, int]]:
     length = len(input)
-    triplets: dict[int, list[int]] = {}
-    longest_matches: dict[int, tuple[int, int]] = {}
-    
+    if length < MIN_MATCH_SIZE:
+        return {}
+    data = np.frombuffer(input, dtype=np.uint8)
+    # Positions with a full triplet
+    count = length - 2
+    positions = np.arange(count)
+
+    # Matches must be at least 2 bytes before the current position, because
+    # the GBA decompression code reads 2 bytes at a time when copying
+    # values. To produce matching compression, matches must be at least 4
+    # bytes before the current position
     min_window_size = 4 if matching else 2
-    triplet = (input[0] << 8) | (input[1] << 16)
 
-    for i in range(length - 2):
-        # Get triplet at current position
-        triplet = (triplet >> 8) | (input[i + 2] << 16)
+    # Group positions by triplet (keeping address order within each group),
+    # so the k-th previous member of a group is the k-th most recent earlier
+    # position with the same triplet
+    triplets = (
+        data[:count].astype(np.int32) |
+        (data[1:count + 1].astype(np.int32) << 8) |
+        (data[2:].astype(np.int32) << 16)
+    )
+    order = np.argsort(triplets, kind="stable")
+    sorted_triplets = triplets[order]
+
+    # The next MAX_MATCH_SIZE bytes at every position, for comparing
+    # candidates a whole window at a time
+    padded = np.concatenate((data, np.zeros(MAX_MATCH_SIZE, dtype=np.uint8)))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, MAX_MATCH_SIZE)
+    max_sizes = np.minimum(MAX_MATCH_SIZE, length - positions)
+
+    longest_lens = np.zeros(count, dtype=np.int64)
+    longest_idxs = np.full(count, -1, dtype=np.int64)
+
+    # Try the most recent candidate of every position at once, then the
+    # next most recent, and so on, until each position runs out of
+    # candidates in its window or finds a match of the max size
+    active = np.arange(count)
+    k = 1
+    while active.size > 0:
+        cand = active - k
+        keep = cand >= 0
+        active = active[keep]
+        cand = cand[keep]
+        keep = sorted_triplets[cand] == sorted_triplets[active]
+        active = active[keep]
+        cand = cand[keep]
+        i = order[active]
+        idx = order[cand]
+        # Stop if past window
+        keep = idx >= i - MAX_WINDOW_SIZE
+        active = active[keep]
+        i = i[keep]
+        idx = idx[keep]
+
+        # Skip candidates that are too close
+        far = idx <= i - min_window_size
+        fi = i[far]
+        fidx = idx[far]
+
+        # Find length of each match
+        same = windows[fi] == windows[fidx]
+        match_lens = np.where(same.all(axis=1), MAX_MATCH_SIZE, same.argmin(axis=1))
+        match_lens = np.minimum(match_lens, max_sizes[fi])
+
+        # Update longest matches (ties keep the most recent candidate)
+        better = match_lens > longest_lens[fi]
+        longest_lens[fi[better]] = match_lens[better]
+        longest_idxs[fi[better]] = fidx[better]
+
+        # Stop looking if max size
+        active = active[longest_lens[i] < max_sizes[i]]
+        k += 1
+
+    found = np.flatnonzero(longest_lens >= MIN_MATCH_SIZE)
+    return dict(zip(
+        found.tolist(),
+        zip(longest_idxs[found].tolist(), longest_lens[found].tolist())
+    ))
 
-        # Check if triplet has no match
-        indexes = triplets.get(triplet)
-        if indexes is None:
-            triplets[triplet] = [i]
-            continue
 
-        window_start = max(i - MAX_WINDOW_SIZE, 0)
-        max_size = min(MAX_MATCH_SIZE, length - i)
-        longest_len = 0
-        longest_idx = -1
-
-        # Matches must be at least 2 bytes before the current position, because
-        # the GBA decompression code reads 2 bytes at a time when copying
-        # values. To produce matching compression, matches must be at least 4
-        # bytes before the current position
-        j = len(indexes) - 1
-        while j >= 0 and indexes[j] > i - min_window_size:
-            j -= 1
-
-        # Try each index to find the longest match
-        for j in range(j, -1, -1):
-            idx = indexes[j]
-            # Stop if past window
-            if idx < window_start:
-                break
+def _find_best_path(length: int, longest_matches: dict[int, tuple[int, int]]) -> list[int]:
+    # Every edge goes forward, so visiting positions in order settles each
+    # one before it is used
+    # Cost of cheapest paths
+    best_scores = [-1] * (length + 1)
+    best_scores[0] = 0
+    # Stores previous node on cheapest path
+    came_from = [-1] * (length + 1)
 
-            # Quick check if match would be longer
-            if longest_len > 0 and input[idx + longest_len] != input[i + longest_len]:
-                continue
+    for idx in range(length):
+        base = best_scores[idx]
 
-            # Find length of match
-            match_len = MIN_MATCH_SIZE
-            while match_len < max_size and input[idx + match_len] == input[i + match_len]:
-                match_len += 1
-            
-            # Update longest match
-            if match_len > longest_len:
-                longest_len = match_len
-                longest_idx = idx
+        # Uncompressed
+        score = base + 9
+        n = idx + 1
+        prev_score = best_scores[n]
+        if prev_score < 0 or score < prev_score or (
+            score == prev_score and base < best_scores[came_from[n]]
+        ):
+            came_from[n] = idx
+            best_scores[n] = score
 
-                # Stop looking if max size
-                if longest_len == max_size:
-                    break
-            
-        indexes.append(i)
-        if longest_len >= MIN_MATCH_SIZE:
-            longest_matches[i] = (longest_idx, longest_len)
+        # Compressed
+        longest = longest_matches.get(idx)
+        if longest is not None:
+            score += 8
+            for n in range(idx + MIN_MATCH_SIZE, idx + longest[1] + 1):
+                # Ties go to the node with the lower score, which is the one a
+                # shortest-first search would have expanded first
+                prev_score = best_scores[n]
+                if prev_score < 0 or score < prev_score or (
+                    score == prev_score and base < best_scores[came_from[n]]
+                ):
+                    came_from[n] = idx
+                    best_scores[n] = score
 
-    return longest_matches
+    return _construct_path(came_from, length)
 
 
-def _find_best_path(length: int, longest_matches: dict[int, tuple[int, int]]) -> list[int]:
+def _find_best_path_heap(length: int, longest_matches: dict[int, tuple[int, int]]) -> list[int]:
+    """
+    The shortest-first search _find_best_path replaced, which returns the
+    same path. Kept as a reference for benchmark and tests.
+    """
     # Set of nodes to explore, sorted by score
     heap = []
     heapq.heappush(heap, (0, 0))
     # Stores previous node on cheapest path
-    came_from: dict[int, int] = {}
+    came_from = [-1] * (length + 1)
     # Cost of cheapest paths
     best_scores: dict[int, int] = {}
     best_scores[0] = 0
@@ -339,7 +549,7 @@ def _find_best_path(length: int, longest_matches: dict[int, tuple[int, int]]) ->
         _, idx = heapq.heappop(heap)
         if idx == length:
             return _construct_path(came_from, idx)
-        
+
         # Uncompressed
         score = best_scores[idx] + 9
         n = idx + 1
@@ -348,14 +558,12 @@ def _find_best_path(length: int, longest_matches: dict[int, tuple[int, int]]) ->
             came_from[n] = idx
             best_scores[n] = score
             heapq.heappush(heap, (score, n))
-        
+
         # Compressed
         longest = longest_matches.get(idx)
         if longest is not None:
-            longest_len = longest[1]
             score += 8
-            for size in range(MIN_MATCH_SIZE, longest_len + 1):
-                n = idx + size
+            for n in range(idx + MIN_MATCH_SIZE, idx + longest[1] + 1):
                 prev_score = best_scores.get(n)
                 if prev_score is None or score < prev_score:
                     came_from[n] = idx
@@ -365,17 +573,50 @@ def _find_best_path(length: int, longest_matches: dict[int, tuple[int, int]]) ->
     raise Exception("Processed heap without reaching input length")
 
 
-def _construct_path(came_from: dict[int, int], idx: int) -> list[int]:
+def _construct_path(came_from: list[int], idx: int) -> list[int]:
     path: list[int] = [idx]
-    while idx in came_from:
+    while idx > 0:
         idx = came_from[idx]
         path.append(idx)
     return path
 
 
+def _measure(fn: Callable[..., bytes], *args) -> tuple[bytes, float, int]:
+    """
+    Returns fn's output, its time in seconds, and its peak traced memory
+    in bytes. Memory is traced in a second run, so tracing doesn't slow
+    down the timed one.
+    """
+    start = time.perf_counter()
+    output = fn(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return output, elapsed, peak
+
+
+def benchmark(input: bytes) -> dict[str, tuple[int, float, int]]:
+    """
+    Compresses data with each method, returning its compressed size, time
+    in seconds and peak traced memory in bytes by method name. OPTIMAL_HEAP
+    is the optimal method with the previous heap based parse, for reference.
+    """
+    results = {}
+    for method in LzCompMethod:
+        output, elapsed, peak = _measure(comp_lz77, input, method)
+        results[method.name] = (len(output), elapsed, peak)
+    output, elapsed, peak = _measure(_comp_lz77_optimal, input, _find_best_path_heap)
+    results["OPTIMAL_HEAP"] = (len(output), elapsed, peak)
+    return results
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("action", type=str, choices=["rle", "lz", "is_lz"])
+    parser.add_argument("action", type=str, choices=["rle", "lz", "is_lz", "any", "bench"])
     apu.add_arg(parser, apu.ArgType.ROM_PATH)
     apu.add_arg(parser, apu.ArgType.ADDR)
 
@@ -392,3 +633,10 @@ if __name__ == "__main__":
     elif args.action == "is_lz":
         size = is_lz77(rom.data, addr)
         print(f"{size:X}")
+    elif args.action == "any":
+        raw, size = decompress_any(rom, addr)
+        print(f"{len(raw):X}\t{size:X}")
+    elif args.action == "bench":
+        raw, _ = decomp_lz77(rom.data, addr)
+        for name, (size, elapsed, peak) in benchmark(raw).items():
+            print(f"{name}\t{size:X}\t{elapsed:.3f}s\t{peak // 1024}KB")
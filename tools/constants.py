@@ -5,6 +5,9 @@ YAML_PATH = "../yaml"
 YAML_EXT = ".yml"
 JSON_PATH = "../json"
 JSON_EXT = ".json"
+# Columnar export written next to each json file
+COLUMNS_EXT = ".npz"
+CACHE_PATH = "../.cache"
 
 MAP_CODE = "code"
 MAP_DATA = "data"
@@ -12,6 +15,9 @@ MAP_ENUMS = "enums"
 MAP_RAM = "ram"
 MAP_STRUCTS = "structs"
 MAP_TYPES = (MAP_CODE, MAP_DATA, MAP_ENUMS, MAP_RAM, MAP_STRUCTS)
+# Parsed by info when present, but not part of the yaml
+MAP_UNIONS = "unions"
+MAP_TYPEDEFS = "typedefs"
 
 GAME_FE6 = "fe6"
 GAME_FE8 = "fe8"
@@ -21,6 +27,27 @@ REGION_J = "J"
 REGION_U = "U"
 REGION_E = "E"
 REGIONS = (REGION_J, REGION_U, REGION_E)
+ALL_REGIONS = REGIONS
+
+# Keys of info entries
+K_NAME = "label"
+K_DESC = "desc"
+K_TYPE = "type"
+K_ADDR = "addr"
+K_SIZE = "size"
+K_COUNT = "count"
+K_OFFSET = "offset"
+K_BITS = "bits"
+K_MODE = "mode"
+K_PARAMS = "params"
+K_RETURN = "return"
+K_VARS = "vars"
+K_VALS = "vals"
+K_VAL = "val"
+K_CAT = "cat"
+K_COMP = "comp"
+K_ENUM = "enum"
+K_LOC = "line"
 
 ASM_MODES = ("thumb", "arm")
 
@@ -1,8 +1,9 @@
 import argparse
 
 import argparse_utils as apu
-from function import all_functions
+from code_model import CodeModel
 from info.game_info import GameInfo
+from lz_finder import LzTable
 from rom import Rom
 
 
@@ -32,7 +33,7 @@ def all_funcs(rom: Rom) -> list[tuple[int, int]]:
     """
     Returns (addr, size) pairs for every function in the ROM.
     """
-    funcs = all_functions(rom)
+    funcs = CodeModel.for_rom(rom).functions()
     sizes = [(f.start_addr, f.end_addr - f.start_addr) for f in funcs]
     sizes += [(k, v - k) for k, v in rom.arm_functions().items()]
     sizes.sort()
@@ -48,7 +49,7 @@ def coverage(rom: Rom):
     # Get total size of data entries
     data_cov = 0
     for entry in info.data:
-        data_cov += entry.get_size(info.sizes, info.types)
+        data_cov += info.get_entry_size(entry)
     # Compute percent of rom covered
     code_size = rom.code_end() - 0xC0
     data_size = rom.data_end() - rom.data_start()
@@ -58,6 +59,19 @@ def coverage(rom: Rom):
     print(f"Total:\t{(code_cov + data_cov) / rom_size:.2%}")
 
 
+def lz_streams(rom: Rom) -> None:
+    """
+    Prints every LZ77 stream in the data region, with the data entry
+    starting at the same address (if any).
+    """
+    info = GameInfo(rom.game, rom.region)
+    entries = {entry.addr: entry for entry in info.data}
+    for offset, comp_size, decomp_size in LzTable.for_rom(rom).streams():
+        entry = entries.get(offset)
+        name = entry.name if entry else ""
+        print(f"{offset:X}\t{comp_size:X}\t{decomp_size:X}\t{name}")
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     apu.add_arg(parser, apu.ArgType.ROM_PATH)
@@ -76,6 +90,9 @@ if __name__ == "__main__":
     # coverage command
     subparser = subparsers.add_parser("coverage",
         help="Computes the percent of ROM code and data with labeled entries")
+    # lz command
+    subparser = subparsers.add_parser("lz",
+        help="Prints all LZ77 streams in data and the entries at them")
 
     args = parser.parse_args()
     rom = apu.get_rom(args.rom_path)
@@ -90,5 +107,7 @@ if __name__ == "__main__":
             print(f"{addr:X}\t{size:X}")
     elif args.command == "coverage":
         coverage(rom)
+    elif args.command == "lz":
+        lz_streams(rom)
     else:
         parser.print_help()
@@ -1,12 +1,15 @@
 import argparse
+from bisect import bisect_right
 from enum import Enum
+from operator import attrgetter
 from typing import Union
 
 import argparse_utils as apu
+from code_model import CodeModel
 from constants import *
-from function import all_functions
 from info.game_info import GameInfo, InfoSource
-from info.info_entry import DataEntry, StructEntry, StructVarEntry, CodeEntry
+from info.info_entry import DataEntry, StructVarEntry, CodeEntry
+from lz_finder import LzTable
 from rom import Rom, ROM_OFFSET
 
 
@@ -40,6 +43,8 @@ class Status(Enum):
     PTR_DATA_MIDDLE = 6
     # The pointer points to the start of a piece of data (likely valid)
     PTR_DATA = 7
+    # The pointer points to the start of unknown LZ77 data (likely valid)
+    PTR_LZ = 8
 
 STATUS_STR = {
     Status.UNKNOWN: "unk",
@@ -50,6 +55,7 @@ STATUS_STR = {
     Status.PTR_CODE: "ptr code",
     Status.PTR_DATA_MIDDLE: "ptr middle data",
     Status.PTR_DATA: "ptr data",
+    Status.PTR_LZ: "ptr lz",
 }
 
 
@@ -85,7 +91,7 @@ def find_code_ptrs(rom: Rom) -> list[int]:
     v_code_start = rom.code_start(True)
     v_data_end = rom.data_end(True)
     ptr_locs: list[int] = []
-    funcs = all_functions(rom)
+    funcs = CodeModel.for_rom(rom).functions()
     for func in funcs:
         ptr_locs += func.get_jump_tables()
         for loc in func.data_pool:
@@ -157,17 +163,14 @@ def find_data_ptrs(rom: Rom, info: GameInfo) -> list[int]:
     code_end = rom.code_end()
     data_start = rom.data_start()
     data_end = rom.data_end()
-    v_code_start = rom.code_start(True)
-    v_data_end = rom.data_end(True)
+    lz_table = LzTable.for_rom(rom)
 
     idx = 0
     ptr_locs: list[PtrLoc] = []
 
-    for addr in range(data_start, data_end, 4):
-        # Check if value at address falls within rom
-        val = rom.read_32(addr)
-        if val < v_code_start or val >= v_data_end:
-            continue
+    # Only visit words whose value falls within rom
+    addrs, vals = rom.ptr_words(data_start, data_end)
+    for addr, val in zip(addrs.tolist(), vals.tolist()):
         val -= ROM_OFFSET
         # Check if this address falls within a known asset
         validity = Validity.UNKNOWN
@@ -179,7 +182,7 @@ def find_data_ptrs(rom: Rom, info: GameInfo) -> list[int]:
             if main_entry.addr % 4 != 0:
                 validity = Validity.INVALID
                 status = Status.LOC_NOT_ALIGNED
-            elif not entry.is_ptr():
+            elif not entry.is_ptr(info.types):
                 validity = Validity.INVALID
                 status = Status.LOC_NOT_PTR
             else:
@@ -206,49 +209,57 @@ def find_data_ptrs(rom: Rom, info: GameInfo) -> list[int]:
                         status = Status.PTR_DATA_MIDDLE
                     else:
                         status = Status.PTR_DATA
+                elif lz_table.stream_at(val) is not None:
+                    status = Status.PTR_LZ
         ptr_loc = PtrLoc(addr, val, validity, status, main_entry)
         ptr_locs.append(ptr_loc)
     return ptr_locs
 
 
 def find_prim_at_offset(
-    entries: Union[list[DataEntry], list[StructVarEntry]],
+    entries: list[DataEntry],
     idx: int,
     offset: int,
     info: GameInfo
-) -> tuple[int, Union[DataEntry, StructEntry], int, int]:
+) -> tuple[int, Union[DataEntry, StructVarEntry], int, int]:
     """
-    Tries to find the primitive at the provided address (for data entries)
-    or offset (for struct var entries).
-    Returns (entry_index, entry, prim_num, prim_offset).
+    Tries to find the primitive at the provided address, looking inside
+    structs, unions and arrays through the entry's flattened layout.
+    Returns (entry_index, entry, prim_num, prim_offset), where entry is the
+    innermost field holding the primitive, or the data entry itself.
     """
     if len(entries) == 0:
         return (idx, None, None, None)
-    off_attr = "offset" if isinstance(entries[0], StructVarEntry) else "addr"
-    while idx < len(entries) and getattr(entries[idx], off_attr) <= offset:
-        idx += 1
-    idx -= 1
+    if entries is info.data:
+        idx = info.get_prev_index(MAP_DATA, offset)
+    else:
+        idx = bisect_right(entries, offset, lo=idx, key=attrgetter("addr")) - 1
+    if idx < 0:
+        return (0, None, None, None)
     entry = entries[idx]
     # Check if address within entry
-    entry_off = getattr(entry, off_attr)
-    length = entry.get_size(info.sizes)
-    if offset < entry_off + length:
-        # Get offset within single item
-        off = offset - entry_off
-        num = 0
-        count = entry.get_count()
-        if count > 1:
-            size = length // count
-            num = off // size
-            off %= size
-        # Check type
-        is_ptr = entry.is_ptr()
-        if not is_ptr and entry.is_struct():
-            # Check primitive at offset
-            s_entry = info.get_struct(entry.struct_name())
-            _, entry, num, off = find_prim_at_offset(s_entry.vars, 0, off, info)
+    off = offset - entry.addr
+    if off >= info.get_entry_size(entry):
+        return (idx, None, None, None)
+    layout = None
+    if entry.type is not None:
+        try:
+            layout = info.layouts.type_layout(entry.type)
+        except (KeyError, ValueError):
+            # e.g. a typedef that hasn't been extracted
+            pass
+    if layout is None or len(layout) == 0:
+        # Treat the entry as one opaque primitive of its size
+        return (idx, entry, 0, off)
+    slot = layout.at(off % len(layout))
+    if slot is None:
+        # Padding
+        return (idx, None, None, None)
+    if slot.var is None:
+        # The entry is a primitive or an array of them
+        num, off = divmod(off, slot.size)
         return (idx, entry, num, off)
-    return (idx, None, None, None)
+    return (idx, slot.var, slot.num, off % len(layout) - slot.offset)
 
 
 def print_ptr_list(title: str, ptrs: list[int]) -> None:
@@ -263,7 +274,7 @@ if __name__ == "__main__":
     apu.add_arg(parser, apu.ArgType.ROM_PATH)
 
     args = parser.parse_args()
-    rom = apu.get_rom(args.rom_path)
+    rom = apu.get_rom(args.rom_path, True)
     info = GameInfo(rom.game, rom.region, InfoSource.YAML_UNK)
 
     c_ptrs = find_code_ptrs(rom)
@@ -1,15 +1,19 @@
 import argparse
 from collections.abc import Iterator
 from enum import Enum, auto
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING
 
 import argparse_utils as apu
 from constants import *
 from info.game_info import GameInfo
-from info.info_entry import CodeMode
 from rom import Rom
 from symbols import Symbols
 from thumb import *
 
+if TYPE_CHECKING:
+    from code_model import FuncInfo
+
 
 class Function:
 
@@ -146,22 +150,33 @@ class Function:
 
     def get_data_pools(self) -> list[tuple[int, int]]:
         # Returns (address, size) pairs of each data pool
-        pools: list[tuple[int, int]] = []
-        all_words = self.data_pool | self.get_jump_tables()
-        if len(all_words) == 0:
-            return pools
-        addrs = sorted(all_words)
-
-        prev_addr = addrs[0]
-        pools.append((prev_addr, 4))
-        for addr in addrs[1:]:
-            if addr == prev_addr + 4:
-                start, size = pools[-1]
-                pools[-1] = (start, size + 4)
-            else:
-                pools.append((addr, 4))
-            prev_addr = addr
+        return group_words(self.data_pool | self.get_jump_tables())
+
+    def get_bls(self) -> list[tuple[int, int]]:
+        """Returns (address, target) of each bl, in address order."""
+        return [
+            (a, self.instructs[a].branch_addr()) for a in sorted(self.instructs)
+            if self.instructs[a].format == ThumbForm.Link
+        ]
+
+
+def group_words(words: set[int]) -> list[tuple[int, int]]:
+    """Groups word addresses into (address, size) pairs of contiguous runs."""
+    pools: list[tuple[int, int]] = []
+    if len(words) == 0:
         return pools
+    addrs = sorted(words)
+
+    prev_addr = addrs[0]
+    pools.append((prev_addr, 4))
+    for addr in addrs[1:]:
+        if addr == prev_addr + 4:
+            start, size = pools[-1]
+            pools[-1] = (start, size + 4)
+        else:
+            pools.append((addr, 4))
+        prev_addr = addr
+    return pools
 
 
 class FuncDiff(Enum):
@@ -179,7 +194,7 @@ class FuncDiff(Enum):
         return self == FuncDiff.SAME_WITH_BL or self == FuncDiff.IDENTICAL
 
 
-def compare(func_a: Function, func_b: Function) -> FuncDiff:
+def compare(func_a: "Function | FuncInfo", func_b: "Function | FuncInfo") -> FuncDiff:
     # Get instructions of both functions
     instructs_a = func_a.get_instructions()
     instructs_b = func_b.get_instructions()
@@ -200,34 +215,6 @@ def compare(func_a: Function, func_b: Function) -> FuncDiff:
     return FuncDiff.SAME_WITH_BL if has_bl else FuncDiff.IDENTICAL
 
 
-def compare_all(rom_a: Rom, rom_b: Rom) -> None:
-    region_a = rom_a.region
-    region_b = rom_b.region
-    assert rom_a.game == rom_b.game and region_a != region_b
-    info = GameInfo(rom_a.game)
-    for entry in info.code:
-        if entry.mode == CodeMode.Arm:
-            continue
-        addr_a = entry.addr.get(region_a)
-        addr_b = entry.addr.get(region_b)
-        msg = None
-        if addr_a is not None and addr_b is not None:
-            func_a = Function(rom_a, addr_a)
-            func_b = Function(rom_b, addr_b)
-            diff = compare(func_a, func_b)
-            if not diff.is_same():
-                msg = diff.name
-        elif addr_a is not None:
-            msg = f"{region_a} only"
-        elif addr_b is not None:
-            msg = f"{region_b} only"
-        if msg is not None:
-            addr_str_a = "" if addr_a is None else f"{addr_a:X}"
-            addr_str_b = "" if addr_b is None else f"{addr_b:X}"
-            print("\t".join([entry.name, msg, addr_str_a, addr_str_b]))
-
-
-
 def all_functions(rom: Rom) -> Iterator[Function]:
     """
     Returns every THUMB function in the ROM.
@@ -244,8 +231,27 @@ def all_functions(rom: Rom) -> Iterator[Function]:
             addr = func.end_addr
 
 
+@lru_cache(maxsize=None)
+def _get_symbols(game: str, region: str) -> Symbols:
+    return Symbols(GameInfo(game, region))
+
+
+def function_asm(
+    func: Function,
+    asm_format: "AsmFormat",
+    include_syms: bool,
+    include_addrs: bool
+) -> str:
+    """Returns the assembly for a function, labeled with the game's symbols."""
+    from asm_writer import AsmWriter
+    syms = _get_symbols(func.rom.game, func.rom.region)
+    writer = AsmWriter.create(func.rom, syms, func.branches, asm_format)
+    return writer.function_str(func, include_syms, include_addrs)
+
+
 if __name__ == "__main__":
     from asm_writer import AsmWriter, AsmFormat
+    from code_model import map_functions
     formats = [n.name.lower() for n in AsmFormat]
     default_format = AsmFormat.ARMIPS.name.lower()
 
@@ -254,13 +260,27 @@ if __name__ == "__main__":
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument("-a", "--addr", type=str)
     group.add_argument("-n", "--name", type=str)
+    group.add_argument("--all", action="store_true",
+        help="Print every function, using a process per core")
     parser.add_argument("-f", "--format", type=str, choices=formats, default=default_format)
     parser.add_argument("-s", "--symbols", action="store_true")
     parser.add_argument("-c", "--addr_comments", action="store_true")
+    parser.add_argument("-p", "--processes", type=int)
 
     args = parser.parse_args()
-    rom = apu.get_rom(args.rom_path)
-    
+    rom = apu.get_rom(args.rom_path, True)
+    asm_format = AsmFormat[args.format.upper()]
+
+    if args.all:
+        fn = partial(function_asm,
+            asm_format=asm_format,
+            include_syms=args.symbols,
+            include_addrs=args.addr_comments
+        )
+        for func_str in map_functions(rom, fn, args.processes):
+            print(func_str)
+        quit()
+
     # Load symbols
     info = GameInfo(rom.game, rom.region)
     syms = Symbols(info)
@@ -282,6 +302,5 @@ if __name__ == "__main__":
 
     # Print function
     func = Function(rom, addr, syms)
-    asm_format = AsmFormat[args.format.upper()]
     writer = AsmWriter.create(rom, syms, func.branches, asm_format)
     print(writer.function_str(func, args.symbols, args.addr_comments))
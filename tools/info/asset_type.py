@@ -1,6 +1,7 @@
 import argparse
 from abc import ABC, abstractmethod
 from enum import Enum, auto
+from functools import lru_cache
 import re
 
 
@@ -44,13 +45,19 @@ class TypeQual(Enum):
 
 
 class AssetType(ABC):
+    """
+    Parsed C type. Types from parse_type are shared between entries, so
+    they are not modified after parsing.
+    """
+
+    __slots__ = ()
 
     @abstractmethod
     def spec_kind(self) -> TypeSpecKind:
         pass
 
     @abstractmethod
-    def spec_names(self) -> list[str]:
+    def spec_names(self) -> tuple[str, ...]:
         pass
 
     @abstractmethod
@@ -72,15 +79,17 @@ class AssetType(ABC):
 
 class SpecifierType(AssetType):
 
+    __slots__ = ("names", "kind", "quals")
+
     def __init__(self, names: list[str], kind: TypeSpecKind, quals: list[TypeQual]):
-        self.names = names
+        self.names = tuple(names)
         self.kind = kind
-        self.quals = quals
+        self.quals = tuple(quals)
 
     def spec_kind(self) -> TypeSpecKind:
         return self.kind
 
-    def spec_names(self) -> list[str]:
+    def spec_names(self) -> tuple[str, ...]:
         return self.names
 
     def spec_name(self) -> str:
@@ -140,13 +149,15 @@ class SpecifierType(AssetType):
 
 class OuterType(AssetType):
 
+    __slots__ = ("inner_type",)
+
     def __init__(self, inner_type: AssetType):
         self.inner_type = inner_type
 
     def spec_kind(self) -> TypeSpecKind:
         return self.inner_type.spec_kind()
 
-    def spec_names(self) -> list[str]:
+    def spec_names(self) -> tuple[str, ...]:
         return self.inner_type.spec_names()
 
     def spec_name(self) -> str:
@@ -155,9 +166,11 @@ class OuterType(AssetType):
 
 class PointerType(OuterType):
 
+    __slots__ = ("quals",)
+
     def __init__(self, inner_type: AssetType, quals: list[TypeQual]):
         super().__init__(inner_type)
-        self.quals = quals
+        self.quals = tuple(quals)
 
     def decl_str(self, decl: str = "") -> str:
         parts = ["*"]
@@ -186,6 +199,8 @@ class PointerType(OuterType):
 
 class ArrayType(OuterType):
 
+    __slots__ = ("size",)
+
     def __init__(self, inner_type: AssetType, size: int):
         super().__init__(inner_type)
         self.size = size
@@ -207,9 +222,11 @@ class ArrayType(OuterType):
 
 class FunctionType(OuterType):
 
+    __slots__ = ("params",)
+
     def __init__(self, inner_type: AssetType, params: list[AssetType]):
         super().__init__(inner_type)
-        self.params = params
+        self.params = tuple(params)
 
     def decl_str(self, decl: str = "") -> str:
         param_str = ""
@@ -516,6 +533,21 @@ class TypeParser:
             raise ValueError(f"Unexpected type qualifier {qs}")
 
 
+_TOKENIZER = TypeTokenizer()
+_PARSER = TypeParser()
+
+
+@lru_cache(maxsize=4096)
+def parse_type(text: str) -> AssetType:
+    """
+    Tokenizes and parses a C type string. Results are cached by string and
+    shared, so repeated types are only parsed once;
+    parse_type.cache_info() reports hits and misses.
+    """
+    tokens = _TOKENIZER.tokenize(text)
+    return _PARSER.parse(tokens)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("text", type=str)
@@ -1,4 +1,7 @@
+from bisect import bisect_right
 from enum import Enum, auto
+from functools import cached_property
+import os
 
 from constants import *
 from info.asset_type import (
@@ -6,11 +9,18 @@ from info.asset_type import (
     SpecifierType, PointerType, ArrayType, FunctionType
 )
 from info.info_entry import *
-from info.info_file_utils import get_info_file_from_json, get_info_file_from_yaml
+from info.struct_layout import StructLayouts
+from info.type_resolver import TypeResolver
+from info.info_file_utils import (
+    InfoFile, find_columns_file, find_json_file, find_yaml_files,
+    get_info_file_from_columns, get_info_file_from_json, get_info_file_from_yaml
+)
 
 
 class InfoSource(Enum):
     JSON = auto()
+    # Columnar export written next to the json
+    COLUMNS = auto()
     YAML = auto()
     # TODO: Get rid of unknown
     YAML_UNK = auto()
@@ -21,43 +31,85 @@ class GameInfo(object):
     def __init__(self,
         game: str,
         region: str = None,
-        source: InfoSource = InfoSource.JSON
+        source: InfoSource = InfoSource.JSON,
+        use_cache: bool = True
     ):
         self.game = game
         self.region = region
-        # Get info from data files
-        if source == InfoSource.JSON:
-            self.ram: list[DataEntry] = get_info_file_from_json(game, MAP_RAM, region)
-            self.code: list[CodeEntry] = get_info_file_from_json(game, MAP_CODE, region)
-            self.data: list[DataEntry] = get_info_file_from_json(game, MAP_DATA, region)
-            struct_list: list[StructEntry] = get_info_file_from_json(game, MAP_STRUCTS, region)
-            enum_list: list[EnumEntry] = get_info_file_from_json(game, MAP_ENUMS, region)
-            union_list: list[UnionEntry] = get_info_file_from_json(game, MAP_UNIONS, region)
-            typedef_list: list[TypedefEntry] = get_info_file_from_json(game, MAP_TYPEDEFS, region)
-        else:
-            include_unk = source == InfoSource.YAML_UNK
-            self.ram: list[DataEntry] = get_info_file_from_yaml(game, MAP_RAM, region, include_unk)
-            self.code: list[CodeEntry] = get_info_file_from_yaml(game, MAP_CODE, region, include_unk)
-            self.data: list[DataEntry] = get_info_file_from_yaml(game, MAP_DATA, region, include_unk)
-            struct_list: list[StructEntry] = get_info_file_from_yaml(game, MAP_STRUCTS, region, include_unk)
-            enum_list: list[EnumEntry] = get_info_file_from_yaml(game, MAP_ENUMS, region, include_unk)
-            union_list: list[UnionEntry] = get_info_file_from_yaml(game, MAP_UNIONS, region, include_unk)
-            typedef_list: list[TypedefEntry] = get_info_file_from_yaml(game, MAP_TYPEDEFS, region, include_unk)
-        # Convert lists to dictionaries
-        self.structs: dict[str, StructEntry] = {e.name: e for e in struct_list}
-        self.enums: dict[str, EnumEntry] = {e.name: e for e in enum_list}
-        self.unions: dict[str, UnionEntry] = {e.name: e for e in union_list}
-        self.typedefs: dict[str, TypedefEntry] = {e.name: e for e in typedef_list}
-        self.types: dict[str, AssetType] = {e.name: e.type for e in typedef_list}
-        # Get sizes of structs, unions, and typedefs
-        self.sizes: dict[str, int] = {}
-        for e in struct_list:
-            self.sizes[e.name] = e.size
-        for e in union_list:
-            self.sizes[e.name] = e.size
-        # for e in typedef_list:
-        #     if e.name not in self.sizes:
-        #         self.sizes[e.name] = self._type_size(e.type)
+        self.source = source
+        self.use_cache = use_cache
+        # Indexes by map type (see below)
+        self._name_indexes: dict[str, dict[str, InfoEntry]] = {}
+        self._addr_keys: dict[str, list[int]] = {}
+
+    # Each map is loaded from its data file on first access
+
+    def _load(self, map_type: str) -> InfoFile:
+        # Not every game has every map extracted yet (e.g. fe8 data, and
+        # unions and typedefs for both), so missing maps are empty
+        if not self._has_map(map_type):
+            return []
+        if self.source == InfoSource.JSON:
+            return get_info_file_from_json(self.game, map_type, self.region, self.use_cache)
+        if self.source == InfoSource.COLUMNS:
+            return get_info_file_from_columns(self.game, map_type, self.region, self.use_cache)
+        include_unk = self.source == InfoSource.YAML_UNK
+        return get_info_file_from_yaml(self.game, map_type, self.region, include_unk, self.use_cache)
+
+    def _has_map(self, map_type: str) -> bool:
+        if self.source == InfoSource.JSON:
+            return os.path.isfile(find_json_file(self.game, map_type))
+        if self.source == InfoSource.COLUMNS:
+            return os.path.isfile(find_columns_file(self.game, map_type))
+        try:
+            return len(find_yaml_files(self.game, map_type)) > 0
+        except ValueError:
+            return False
+
+    @cached_property
+    def ram(self) -> list[DataEntry]:
+        return self._load(MAP_RAM)
+
+    @cached_property
+    def code(self) -> list[CodeEntry]:
+        return self._load(MAP_CODE)
+
+    @cached_property
+    def data(self) -> list[DataEntry]:
+        return self._load(MAP_DATA)
+
+    @cached_property
+    def structs(self) -> dict[str, StructEntry]:
+        return {e.name: e for e in self._load(MAP_STRUCTS)}
+
+    @cached_property
+    def enums(self) -> dict[str, EnumEntry]:
+        return {e.name: e for e in self._load(MAP_ENUMS)}
+
+    @cached_property
+    def unions(self) -> dict[str, UnionEntry]:
+        return {e.name: e for e in self._load(MAP_UNIONS)}
+
+    @cached_property
+    def typedefs(self) -> dict[str, TypedefEntry]:
+        return {e.name: e for e in self._load(MAP_TYPEDEFS)}
+
+    @cached_property
+    def types(self) -> dict[str, AssetType]:
+        return {k: e.type for k, e in self.typedefs.items()}
+
+    @cached_property
+    def sizes(self) -> dict[str, int]:
+        """Sizes of structs and unions."""
+        sizes: dict[str, int] = {}
+        for e in self.structs.values():
+            sizes[e.name] = e.size
+        for e in self.unions.values():
+            sizes[e.name] = e.size
+        # for e in self.typedefs.values():
+        #     if e.name not in sizes:
+        #         sizes[e.name] = self._type_size(e.type)
+        return sizes
 
     def get_enum(self, key: str) -> EnumEntry:
         return self.enums[key]
@@ -65,23 +117,104 @@ class GameInfo(object):
     def get_struct(self, key: str) -> StructEntry:
         return self.structs[key]
 
+    # Indexes are built on first use and assume the entry lists are not
+    # modified afterwards
+
+    def _name_index(self, map_type: str) -> dict[str, InfoEntry]:
+        index = self._name_indexes.get(map_type)
+        if index is None:
+            index = {}
+            for entry in self._entries(map_type):
+                # Keep the first entry with each name
+                index.setdefault(entry.name, entry)
+            self._name_indexes[map_type] = index
+        return index
+
+    @cached_property
+    def _addr_index(self) -> dict[int, InfoEntry]:
+        index = {}
+        for entries in (self.ram, self.code, self.data):
+            for entry in entries:
+                if isinstance(entry.addr, int):
+                    index.setdefault(entry.addr, entry)
+        return index
+
+    def _addr_key_list(self, map_type: str) -> list[int]:
+        """Addresses of the map's entries, for binary searches."""
+        keys = self._addr_keys.get(map_type)
+        if keys is None:
+            keys = [e.addr for e in self._entries(map_type)]
+            if not all(isinstance(a, int) for a in keys):
+                raise ValueError("Entries need a region to be searched by address")
+            self._addr_keys[map_type] = keys
+        return keys
+
+    @cached_property
+    def _intervals(self) -> tuple[list[int], list[int], list[int], list[InfoEntry]]:
+        """
+        (starts, ends, max_ends, entries) of every ram, code, and data
+        entry, sorted by start. max_ends[i] is the largest end of any
+        entry up to i, which bounds how far back a containing entry can be.
+        """
+        pairs = []
+        for entries in (self.ram, self.code, self.data):
+            for entry in entries:
+                if isinstance(entry.addr, int):
+                    pairs.append((entry.addr, self.get_entry_size(entry), entry))
+        pairs.sort(key=lambda p: p[0])
+        starts = [p[0] for p in pairs]
+        ends = [p[0] + p[1] for p in pairs]
+        max_ends = []
+        max_end = 0
+        for end in ends:
+            max_end = max(max_end, end)
+            max_ends.append(max_end)
+        return starts, ends, max_ends, [p[2] for p in pairs]
+
+    def _entries(self, map_type: str) -> list[InfoEntry]:
+        """Returns the ram, code, or data entry list."""
+        if map_type == MAP_RAM:
+            return self.ram
+        elif map_type == MAP_CODE:
+            return self.code
+        elif map_type == MAP_DATA:
+            return self.data
+        raise ValueError(map_type)
+
+    @cached_property
+    def resolver(self) -> TypeResolver:
+        """Size and alignment resolver, with every typedef resolved up front."""
+        resolver = TypeResolver(self.sizes, self.types)
+        resolver.resolve_all()
+        return resolver
+
+    @cached_property
+    def layouts(self) -> StructLayouts:
+        """Flattened struct, union and type layouts, built on first use."""
+        return StructLayouts(self.structs, self.unions, self.resolver)
+
+    def get_entry_size(self, entry: InfoEntry) -> int:
+        """Gets the total size of a code, data, or variable entry."""
+        if isinstance(entry, CodeEntry):
+            return entry.size if isinstance(entry.size, int) else 0
+        if entry.type is not None:
+            try:
+                return self.resolver.size_of(entry.type) * entry.get_count()
+            except (KeyError, ValueError):
+                # e.g. a typedef that hasn't been extracted
+                pass
+        # Fall back to the size written by the extractor
+        size = getattr(entry, "size", None)
+        return size if isinstance(size, int) else 0
+
     def get_ram(self, name: str) -> DataEntry:
-        for gv in self.ram:
-            if gv.name == name:
-                return gv
-        return None
+        return self._name_index(MAP_RAM).get(name)
 
     def get_code(self, name: str) -> CodeEntry:
-        for ce in self.code:
-            if ce.name == name:
-                return ce
-        return None
+        return self._name_index(MAP_CODE).get(name)
 
     def get_data(self, name: str) -> DataEntry:
-        for gv in self.data:
-            if gv.name == name:
-                return gv
-        return None
+        return self._name_index(MAP_DATA).get(name)
 
     def get_entry(self, name: str) -> InfoEntry:
         getters = (self.get_ram, self.get_code, self.get_data)
@@ -92,11 +225,33 @@ class GameInfo(object):
         return None
 
     def get_entry_by_addr(self, addr: int) -> InfoEntry:
-        entry_lists = (self.ram, self.code, self.data)
-        for entry_list in entry_lists:
-            for entry in entry_list:
-                if entry.addr == addr:
-                    return entry
+        return self._addr_index.get(addr)
+
+    def get_prev_index(self, map_type: str, addr: int) -> int:
+        """
+        Returns the index of the last entry of the map type (ram, code,
+        or data) whose address is <= addr, or -1 if there is none.
+        """
+        return bisect_right(self._addr_key_list(map_type), addr) - 1
+
+    def get_prev_entry(self, map_type: str, addr: int) -> InfoEntry:
+        """Returns the last entry of the map type whose address is <= addr."""
+        idx = self.get_prev_index(map_type, addr)
+        if idx < 0:
+            return None
+        return self._entries(map_type)[idx]
+
+    def get_entry_containing(self, addr: int) -> InfoEntry:
+        """
+        Returns the ram, code, or data entry whose bytes include addr.
+        If entries overlap, the one starting last is returned.
+        """
+        starts, ends, max_ends, entries = self._intervals
+        i = bisect_right(starts, addr) - 1
+        while i >= 0 and max_ends[i] > addr:
+            if ends[i] > addr:
+                return entries[i]
+            i -= 1
         return None
 
     def name_exists(self, name: str) -> bool:
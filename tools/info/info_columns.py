@@ -0,0 +1,332 @@
+from collections.abc import Callable
+import json
+from functools import cached_property
+from operator import itemgetter
+import os
+from typing import Any
+
+import numpy as np
+
+from constants import *
+
+
+INFO_COLUMNS_VERSION = 2
+# Fields stored as a uint32 per region rather than as json values
+REGION_INT_FIELDS = ("addr", "size", "count", "offset", "val")
+# Set in a region int mask when the value applies to every region
+ALL_REGIONS_FLAG = 0x80
+
+
+def _hex_int(s: Any) -> int:
+    """Parses a hex string as written by ints_to_strs, or returns None."""
+    if not isinstance(s, str):
+        return None
+    try:
+        val = int(s, 16)
+    except ValueError:
+        return None
+    # Anything that wouldn't be written back the same way is kept as json
+    if not 0 <= val < 1 << 32 or f"{val:X}" != s:
+        return None
+    return val
+
+
+def _region_ints(value: Any) -> tuple[int, list[int]]:
+    """
+    Packs a hex string or a dictionary of them by region into
+    (mask, value per region), or returns None if it can't be.
+    """
+    val = _hex_int(value)
+    if val is not None:
+        return ALL_REGIONS_FLAG, [val] * len(REGIONS)
+    if not isinstance(value, dict) or not value:
+        return None
+    mask = 0
+    vals = [0] * len(REGIONS)
+    for region, s in value.items():
+        val = _hex_int(s)
+        if region not in REGIONS or val is None:
+            return None
+        i = REGIONS.index(region)
+        mask |= 1 << i
+        vals[i] = val
+    return mask, vals
+
+
+def _is_rows(value: Any) -> bool:
+    """Returns whether a value is a list of objects, stored as child rows."""
+    return isinstance(value, list) and all(isinstance(v, dict) for v in value)
+
+
+def encode_info_columns(
+    objs: list[dict[str, Any]],
+    prefix: str = ""
+) -> dict[str, np.ndarray]:
+    """
+    Encodes the entries of a json info file as columns. Addresses, sizes,
+    counts, offsets and values become a uint32 per region. Lists of
+    objects (struct vars, params, enum vals) become the rows of a child
+    table of their own, with the entries' row ranges. Every other field
+    becomes a code into an interned string table (labels, types, modes...),
+    or into a table of other json values, so repeated values are stored
+    once. Codes are the string index, -1 for no value, and -2 - i for json
+    value i.
+    """
+    keys: dict[str, int] = {}
+    for obj in objs:
+        for key in obj:
+            keys.setdefault(key, len(keys))
+    # Readers track which keys each entry has in an int64
+    if len(keys) > 63:
+        raise ValueError("Too many fields for info columns")
+    n = len(objs)
+    strings: dict[str, int] = {}
+    values: dict[str, int] = {}
+    cols = [np.full(n, -1, np.int32) for _ in keys]
+    regs = {
+        keys[k]: (np.zeros((n, len(REGIONS)), np.uint32), np.zeros(n, np.uint8))
+        for k in REGION_INT_FIELDS if k in keys
+    }
+    children: dict[int, tuple[list[Any], np.ndarray, np.ndarray]] = {}
+    for i, obj in enumerate(objs):
+        for key, value in obj.items():
+            j = keys[key]
+            if j in regs:
+                packed = _region_ints(value)
+                if packed is not None:
+                    regs[j][1][i], regs[j][0][i] = packed
+                    continue
+            if _is_rows(value):
+                if j not in children:
+                    children[j] = ([], np.zeros(n, np.uint32), np.zeros(n, np.uint8))
+                rows, ends, has_rows = children[j]
+                rows += value
+                ends[i] = len(rows)
+                has_rows[i] = 1
+                continue
+            if isinstance(value, str):
+                cols[j][i] = strings.setdefault(value, len(strings))
+            else:
+                cols[j][i] = -2 - values.setdefault(json.dumps(value), len(values))
+
+    arrays = {
+        prefix + "version": np.array(INFO_COLUMNS_VERSION),
+        prefix + "count": np.array(n),
+        prefix + "keys": np.array(list(keys), dtype=str),
+    }
+    # Strings are sliced after decoding, so their offsets are in characters
+    string_offsets = np.zeros(len(strings) + 1, np.uint32)
+    np.cumsum([len(s) for s in strings], out=string_offsets[1:])
+    arrays[prefix + "string_data"] = np.frombuffer("".join(strings).encode(), np.uint8)
+    arrays[prefix + "string_offsets"] = string_offsets
+    encoded = [v.encode() for v in values]
+    value_offsets = np.zeros(len(encoded) + 1, np.uint32)
+    np.cumsum([len(e) for e in encoded], out=value_offsets[1:])
+    arrays[prefix + "value_data"] = np.frombuffer(b"".join(encoded), np.uint8)
+    arrays[prefix + "value_offsets"] = value_offsets
+    for j, col in enumerate(cols):
+        arrays[f"{prefix}col_{j}"] = col
+    for j, (rows, masks) in regs.items():
+        arrays[f"{prefix}reg_{j}"] = rows
+        arrays[f"{prefix}mask_{j}"] = masks
+    for j, (rows, ends, has_rows) in children.items():
+        # Entries without rows end where the previous one did
+        arrays[f"{prefix}ends_{j}"] = np.maximum.accumulate(ends)
+        arrays[f"{prefix}rows_{j}"] = has_rows
+        arrays.update(encode_info_columns(rows, f"{prefix}child_{j}_"))
+    return arrays
+
+
+def write_info_columns(path: str, objs: list[dict[str, Any]]) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **encode_info_columns(objs))
+    os.replace(tmp_path, path)
+
+
+class InfoColumns:
+    """
+    The columns of an exported info file, or of the rows of one of its
+    lists of objects. Loading only reads the arrays; strings and json
+    values are decoded when first needed.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], prefix: str = ""):
+        if int(arrays[prefix + "version"]) != INFO_COLUMNS_VERSION:
+            raise ValueError("Outdated info columns")
+        self.prefix = prefix
+        self.count = int(arrays[prefix + "count"])
+        self.keys: list[str] = arrays[prefix + "keys"].tolist()
+        self.arrays = arrays
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _array(self, name: str) -> np.ndarray:
+        return self.arrays[self.prefix + name]
+
+    def _has_array(self, name: str) -> bool:
+        return self.prefix + name in self.arrays
+
+    @classmethod
+    def load(cls, path: str) -> "InfoColumns":
+        with np.load(path) as f:
+            return cls({k: f[k] for k in f.files})
+
+    @cached_property
+    def strings(self) -> list[str]:
+        data = self._array("string_data").tobytes().decode()
+        offsets = self._array("string_offsets").tolist()
+        return [data[a:b] for a, b in zip(offsets, offsets[1:])]
+
+    @cached_property
+    def value_texts(self) -> list[bytes]:
+        data = self._array("value_data").tobytes()
+        offsets = self._array("value_offsets").tolist()
+        return [data[a:b] for a, b in zip(offsets, offsets[1:])]
+
+    @cached_property
+    def values(self) -> list[Any]:
+        # One decode of the whole table is much faster than one per value
+        return json.loads(b"[" + b",".join(self.value_texts) + b"]")
+
+    @cached_property
+    def table(self) -> list[Any]:
+        """
+        Values indexed directly by code: strings from the front, and -1 (no
+        value) then the json values from the back.
+        """
+        return self.strings + self.values[::-1] + [None]
+
+    def child(self, key: str) -> "InfoColumns":
+        """
+        Returns the rows stored for a field's lists of objects, or None
+        if it has none.
+        """
+        j = self.keys.index(key)
+        if not self._has_array(f"rows_{j}"):
+            return None
+        return InfoColumns(self.arrays, f"{self.prefix}child_{j}_")
+
+    def column(
+        self,
+        key: str,
+        build: Callable[["InfoColumns"], list[Any]] = None
+    ) -> list[Any]:
+        """
+        Returns a field's value for every entry, or None where it's missing.
+        Addresses, sizes, counts, offsets and values are ints (or
+        dictionaries of them by region) rather than hex strings. Lists of
+        objects are made by build from the child rows, one item per row,
+        and are json objects by default. Other lists and dictionaries are
+        shared by the entries with the same value, so they must not be
+        modified.
+        """
+        if key not in self.keys:
+            return [None] * self.count
+        j = self.keys.index(key)
+        table = self.table
+        vals = [table[c] for c in self._array(f"col_{j}").tolist()]
+        if self._has_array(f"reg_{j}"):
+            reg_vals = self._array(f"reg_{j}")
+            masks = self._array(f"mask_{j}")
+            scalars = np.flatnonzero(masks == ALL_REGIONS_FLAG)
+            for i, val in zip(scalars.tolist(), reg_vals[scalars, 0].tolist()):
+                vals[i] = val
+            by_region = np.flatnonzero((masks != 0) & (masks != ALL_REGIONS_FLAG))
+            for i, mask, row in zip(by_region.tolist(), masks[by_region].tolist(), reg_vals[by_region].tolist()):
+                vals[i] = {r: row[k] for k, r in enumerate(REGIONS) if mask & (1 << k)}
+        if self._has_array(f"rows_{j}"):
+            items = (build or InfoColumns.to_objs)(self.child(key))
+            ends = self._array(f"ends_{j}").tolist()
+            for i in np.flatnonzero(self._array(f"rows_{j}")).tolist():
+                vals[i] = items[ends[i - 1] if i else 0:ends[i]]
+        return vals
+
+    def codes(self, key: str) -> np.ndarray:
+        """Returns the value codes of a field (see encode_info_columns)."""
+        return self._array(f"col_{self.keys.index(key)}")
+
+    def region_ints(self, key: str, region: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the values of an address or size field in the region, and
+        which entries have one there.
+        """
+        j = self.keys.index(key)
+        masks = self._array(f"mask_{j}")
+        k = REGIONS.index(region)
+        present = (masks & (ALL_REGIONS_FLAG | (1 << k))) != 0
+        return self._array(f"reg_{j}")[:, k], present
+
+    def to_objs(self) -> list[dict[str, Any]]:
+        """Returns the same objects as loading the exported json file."""
+        n = self.count
+        keys = self.keys
+        cols = [self._array(f"col_{j}") for j in range(len(keys))]
+        texts = self.value_texts
+        values = self.values
+        table = self.table
+        # Lists and dicts used by several entries are decoded for each use,
+        # so entries don't share them
+        all_codes = np.concatenate(cols) if cols else np.zeros(0, np.int32)
+        uses = np.bincount(-2 - all_codes[all_codes <= -2], minlength=len(values))
+        repeated = [
+            -2 - i for i in np.flatnonzero(uses > 1).tolist()
+            if isinstance(values[i], (list, dict))
+        ]
+
+        # Rows are grouped by which keys they have, so each dict is built
+        # from just its own keys
+        pattern = np.zeros(n, np.int64)
+        columns = []
+        for j, col in enumerate(cols):
+            vals = [table[c] for c in col.tolist()]
+            if repeated:
+                for i in np.flatnonzero(np.isin(col, repeated)).tolist():
+                    vals[i] = json.loads(texts[-2 - int(col[i])])
+            present = col != -1
+            if self._has_array(f"reg_{j}"):
+                reg_vals = self._array(f"reg_{j}")
+                masks = self._array(f"mask_{j}")
+                scalars = np.flatnonzero(masks == ALL_REGIONS_FLAG)
+                for i, val in zip(scalars.tolist(), reg_vals[scalars, 0].tolist()):
+                    vals[i] = f"{val:X}"
+                by_region = np.flatnonzero((masks != 0) & (masks != ALL_REGIONS_FLAG))
+                for i, mask, row in zip(by_region.tolist(), masks[by_region].tolist(), reg_vals[by_region].tolist()):
+                    vals[i] = {
+                        r: f"{row[k]:X}" for k, r in enumerate(REGIONS) if mask & (1 << k)
+                    }
+                present |= masks != 0
+            if self._has_array(f"rows_{j}"):
+                child_objs = self.child(keys[j]).to_objs()
+                ends = self._array(f"ends_{j}").tolist()
+                has_rows = self._array(f"rows_{j}")
+                for i in np.flatnonzero(has_rows).tolist():
+                    vals[i] = child_objs[ends[i - 1] if i else 0:ends[i]]
+                present |= has_rows != 0
+            pattern |= present.astype(np.int64) << j
+            columns.append(vals)
+
+        objs = [None] * n
+        for p in np.unique(pattern).tolist():
+            group_keys = [k for j, k in enumerate(keys) if p >> j & 1]
+            group_cols = [c for j, c in enumerate(columns) if p >> j & 1]
+            rows = np.flatnonzero(pattern == p).tolist()
+            if len(rows) < n:
+                get = itemgetter(*rows) if len(rows) > 1 else lambda c: (c[rows[0]],)
+                group_cols = [get(c) for c in group_cols]
+            if group_keys:
+                for i, row in zip(rows, zip(*group_cols)):
+                    objs[i] = dict(zip(group_keys, row))
+            else:
+                for i in rows:
+                    objs[i] = {}
+        return objs
+
+
+def read_info_columns(path: str) -> list[dict[str, Any]]:
+    """
+    Loads a columnar info file and returns the same objects as loading
+    the json file it was exported with.
+    """
+    return InfoColumns.load(path).to_objs()
@@ -1,19 +1,44 @@
 from abc import ABC, abstractmethod
 from enum import Enum, auto
+import sys
 from typing import Any, Union
 
 from constants import *
 from info.asset_type import (
     BUILT_IN_SIZES, TypeSpecKind, AssetType, SpecifierType, OuterType,
-    PointerType, ArrayType, FunctionType, TypeTokenizer, TypeParser
+    PointerType, ArrayType, FunctionType, parse_type
 )
 
 
 RegionInt = Union[int, dict[str, int]]
 """Type for numbers that can vary by region (addr, size)"""
 
-TOKENIZER = TypeTokenizer()
-PARSER = TypeParser()
+
+def intern_str(s: str) -> str:
+    """Interns names and other strings repeated across entries."""
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+def parse_type_text(text: str) -> AssetType:
+    """Parses a type string, or returns None if it's missing or unsupported."""
+    if text is None:
+        return None
+    try:
+        return parse_type(text)
+    except ValueError:
+        return None
+
+
+def parse_region_int(value: Any) -> RegionInt:
+    """
+    Parses a number as written to the info files (an int or hex string,
+    or a dictionary of them by region).
+    """
+    if isinstance(value, str):
+        return int(value, 16)
+    if isinstance(value, dict):
+        return {r: parse_region_int(v) for r, v in value.items()}
+    return value
 
 
 class Category(Enum):
@@ -81,8 +106,10 @@ STR_TO_MODE = {s: m for m, s in MODE_TO_STR.items()}
 
 class InfoEntry(ABC):
 
+    __slots__ = ("desc",)
+
     def __init__(self, desc: str):
-        self.desc = desc
+        self.desc = intern_str(desc)
 
     def to_region(self, region: str) -> bool:
         return True
@@ -124,6 +151,8 @@ class InfoEntry(ABC):
 
 class TypedefEntry(InfoEntry):
 
+    __slots__ = ("name", "type", "loc")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -131,9 +160,8 @@ class TypedefEntry(InfoEntry):
         loc: str
     ):
         super().__init__(desc)
-        self.name = name
-        tokens = TOKENIZER.tokenize(type)
-        self.type = PARSER.parse(tokens)
+        self.name = intern_str(name)
+        self.type = parse_type(type)
         self.loc = loc
 
     def __str__(self) -> str:
@@ -163,6 +191,8 @@ class TypedefEntry(InfoEntry):
 
 class VarEntry(InfoEntry):
 
+    __slots__ = ("type", "type_text", "arr_count", "cat", "comp", "enum")
+
     def __init__(self,
         desc: str,
         type: str,
@@ -174,12 +204,15 @@ class VarEntry(InfoEntry):
         enum: str = None
     ):
         super().__init__(desc)
-        tokens = TOKENIZER.tokenize(type)
-        self.type = PARSER.parse(tokens)
+        # Types the parser can't handle yet (unsized arrays, named
+        # parameters, attributes...) are only kept as text, and untyped
+        # entries have neither
+        self.type = parse_type_text(type)
+        self.type_text = intern_str(type)
         self.arr_count = arr_count
         self.cat = cat
         self.comp = comp
-        self.enum = enum
+        self.enum = intern_str(enum)
 
     def __str__(self) -> str:
         return self.type_str()
@@ -195,7 +228,7 @@ class VarEntry(InfoEntry):
     def spec_kind(self) -> TypeSpecKind:
         return self.type.spec_kind()
 
-    def spec_names(self) -> list[str]:
+    def spec_names(self) -> tuple[str, ...]:
         """Returns the base type names (without pointers and arrays)."""
         return self.type.spec_names()
 
@@ -204,6 +237,8 @@ class VarEntry(InfoEntry):
         return self.type.spec_name()
 
     def type_str(self) -> str:
+        if self.type is None:
+            return self.type_text
         return self.type.decl_str()
 
     def is_ptr(self, typedefs: dict[str, AssetType]) -> bool:
@@ -215,7 +250,10 @@ class VarEntry(InfoEntry):
             if isinstance(type, OuterType):
                 type = type.inner_type
             elif isinstance(type, SpecifierType) and type.kind == TypeSpecKind.TYPEDEF:
-                type = typedefs[type.spec_name()]
+                # Typedefs that haven't been extracted aren't known pointers
+                type = typedefs.get(type.spec_name())
+                if type is None:
+                    return False
             else:
                 return False
 
@@ -256,7 +294,7 @@ class VarEntry(InfoEntry):
         return self.type.get_size(sizes, typedefs) * self.get_count()
 
     def get_alignment(self, typedefs: dict[str, AssetType]) -> int:
-        self.type.get_alignment(self, typedefs)
+        return self.type.get_alignment(typedefs)
 
     @staticmethod
     def from_obj(obj: Any) -> "VarEntry":
@@ -269,7 +307,7 @@ class VarEntry(InfoEntry):
         return VarEntry(
             obj.get(K_DESC),
             obj[K_TYPE],
-            obj.get(K_COUNT),
+            parse_region_int(obj.get(K_COUNT)),
             cat,
             comp,
             obj.get(K_ENUM)
@@ -294,6 +332,8 @@ class VarEntry(InfoEntry):
 
 class NamedVarEntry(VarEntry):
 
+    __slots__ = ("name",)
+
     def __init__(self,
         name: str,
         desc: str,
@@ -306,7 +346,7 @@ class NamedVarEntry(VarEntry):
         enum: str = None
     ):
         super().__init__(desc, type, arr_count, cat, comp, enum)
-        self.name = name
+        self.name = intern_str(name)
 
     def c_str(self) -> str:
         t = self.type
@@ -325,10 +365,11 @@ class NamedVarEntry(VarEntry):
         if K_COMP in obj:
             comp = STR_TO_COMP[obj[K_COMP]]
         return NamedVarEntry(
-            obj[K_NAME],
+            # Parameters may be unnamed
+            obj.get(K_NAME),
             obj.get(K_DESC),
             obj[K_TYPE],
-            obj.get(K_COUNT),
+            parse_region_int(obj.get(K_COUNT)),
             cat,
             comp,
             obj.get(K_ENUM)
@@ -353,6 +394,8 @@ class NamedVarEntry(VarEntry):
 
 class DataEntry(NamedVarEntry):
 
+    __slots__ = ("addr", "loc", "size")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -362,11 +405,14 @@ class DataEntry(NamedVarEntry):
         loc: str,
         cat: Category = None,
         comp: Compression = None,
-        enum: str = None
+        enum: str = None,
+        # Size in bytes as written by the extractor, if known
+        size: RegionInt = None
     ):
         super().__init__(name, desc, type, arr_count, cat, comp, enum)
         self.addr = addr
         self.loc = loc
+        self.size = size
 
     def __str__(self) -> str:
         return f"{self.name}"
@@ -384,6 +430,10 @@ class DataEntry(NamedVarEntry):
         if isinstance(self.arr_count, dict):
             if region in self.arr_count:
                 self.arr_count = self.arr_count[region]
+        # Check size
+        if isinstance(self.size, dict):
+            if region in self.size:
+                self.size = self.size[region]
         return True
 
     @staticmethod
@@ -399,12 +449,13 @@ class DataEntry(NamedVarEntry):
                 obj[K_NAME],
                 obj.get(K_DESC),
                 obj[K_TYPE],
-                obj.get(K_COUNT),
-                obj[K_ADDR],
+                parse_region_int(obj.get(K_COUNT)),
+                parse_region_int(obj[K_ADDR]),
                 obj.get(K_LOC),
                 cat,
                 comp,
-                obj.get(K_ENUM)
+                obj.get(K_ENUM),
+                parse_region_int(obj.get(K_SIZE))
             )
         except:
             raise Exception(f"Error parsing data entry: {obj}")
@@ -422,6 +473,8 @@ class DataEntry(NamedVarEntry):
         if entry.comp:
             obj.append((K_COMP, COMP_TO_STR[entry.comp]))
         obj.append((K_ADDR, entry.addr))
+        if entry.size is not None:
+            obj.append((K_SIZE, entry.size))
         if entry.enum:
             obj.append((K_ENUM, entry.enum))
         obj.append((K_LOC, entry.loc))
@@ -430,6 +483,8 @@ class DataEntry(NamedVarEntry):
 
 class StructVarEntry(NamedVarEntry):
 
+    __slots__ = ("offset", "bits")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -477,8 +532,8 @@ class StructVarEntry(NamedVarEntry):
             obj[K_NAME],
             obj.get(K_DESC),
             obj[K_TYPE],
-            obj.get(K_COUNT),
-            obj[K_OFFSET],
+            parse_region_int(obj.get(K_COUNT)),
+            parse_region_int(obj[K_OFFSET]),
             obj.get(K_BITS),
             cat,
             comp,
@@ -507,6 +562,8 @@ class StructVarEntry(NamedVarEntry):
 
 class StructEntry(InfoEntry):
 
+    __slots__ = ("name", "size", "vars", "loc")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -515,7 +572,7 @@ class StructEntry(InfoEntry):
         loc: str
     ):
         super().__init__(desc)
-        self.name = name
+        self.name = intern_str(name)
         self.size = size
         self.vars = vars
         self.loc = loc
@@ -546,7 +603,7 @@ class StructEntry(InfoEntry):
             return StructEntry(
                 obj[K_NAME],
                 obj.get(K_DESC),
-                obj[K_SIZE],
+                parse_region_int(obj[K_SIZE]),
                 vars,
                 obj.get(K_LOC)
             )
@@ -567,6 +624,8 @@ class StructEntry(InfoEntry):
 
 class UnionEntry(InfoEntry):
 
+    __slots__ = ("name", "size", "vars", "loc")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -575,7 +634,7 @@ class UnionEntry(InfoEntry):
         loc: str
     ):
         super().__init__(desc)
-        self.name = name
+        self.name = intern_str(name)
         self.size = size
         self.vars = vars
         self.loc = loc
@@ -606,7 +665,7 @@ class UnionEntry(InfoEntry):
             return UnionEntry(
                 obj[K_NAME],
                 obj.get(K_DESC),
-                obj[K_SIZE],
+                parse_region_int(obj[K_SIZE]),
                 vars,
                 obj.get(K_LOC)
             )
@@ -627,6 +686,8 @@ class UnionEntry(InfoEntry):
 
 class CodeEntry(InfoEntry):
 
+    __slots__ = ("name", "addr", "size", "mode", "params", "ret", "loc")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -638,7 +699,7 @@ class CodeEntry(InfoEntry):
         loc: str
     ):
         super().__init__(desc)
-        self.name = name
+        self.name = intern_str(name)
         self.addr = addr
         self.size = size
         self.mode = mode
@@ -675,8 +736,8 @@ class CodeEntry(InfoEntry):
             return CodeEntry(
                 obj[K_NAME],
                 obj.get(K_DESC),
-                obj[K_ADDR],
-                obj[K_SIZE],
+                parse_region_int(obj[K_ADDR]),
+                parse_region_int(obj[K_SIZE]),
                 STR_TO_MODE[obj[K_MODE]],
                 params,
                 ret,
@@ -705,13 +766,15 @@ class CodeEntry(InfoEntry):
 
 class EnumValEntry(InfoEntry):
 
+    __slots__ = ("name", "val")
+
     def __init__(self,
         name: str,
         desc: str,
         val: int
     ):
         super().__init__(desc)
-        self.name = name
+        self.name = intern_str(name)
         self.val = val
 
     def __str__(self) -> str:
@@ -725,7 +788,7 @@ class EnumValEntry(InfoEntry):
         return EnumValEntry(
             obj[K_NAME],
             obj.get(K_DESC),
-            obj[K_VAL]
+            parse_region_int(obj[K_VAL])
         )
 
     @staticmethod
@@ -739,6 +802,8 @@ class EnumValEntry(InfoEntry):
 
 class EnumEntry(InfoEntry):
 
+    __slots__ = ("name", "vals", "loc")
+
     def __init__(self,
         name: str,
         desc: str,
@@ -746,7 +811,7 @@ class EnumEntry(InfoEntry):
         loc: str
     ):
         super().__init__(desc)
-        self.name = name
+        self.name = intern_str(name)
         self.vals = vals
         self.loc = loc
 
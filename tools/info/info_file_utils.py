@@ -1,17 +1,24 @@
-from collections.abc import Generator, Iterable
+from collections.abc import Callable, Generator, Iterable
 import json
 import math
 import os
+import pickle
 
 import yaml
 
 from constants import *
+from info.info_columns import InfoColumns
 from info.info_entry import *
+from yaml_loader import load_yaml
 from typing import Any
 
 
 InfoFile = list[InfoEntry]
 
+# Bump when parsed entries change shape, to drop stale caches
+INFO_CACHE_VERSION = 2
+INFO_CACHE_PATH = os.path.join(CACHE_PATH, "info")
+
 
 def hex_int_presenter(dumper, data: int):
     return dumper.represent_int(f"0x{data:X}")
@@ -24,7 +31,13 @@ def find_yaml_files(
     map_type: str,
     include_unk: bool = False
 ) -> list[str]:
-    """Finds all yaml files of the provided type and returns their paths."""
+    """
+    Finds all yaml files of the provided type (a single <map_type>.yml,
+    or a directory of them) and returns their paths.
+    """
+    file_path = os.path.join(YAML_PATH, game, map_type + YAML_EXT)
+    if os.path.isfile(file_path):
+        return [file_path]
     dir_path = os.path.join(YAML_PATH, game, map_type)
     paths = None
     if not os.path.isdir(dir_path):
@@ -44,13 +57,17 @@ def find_json_file(
     return os.path.join(JSON_PATH, game, map_type + JSON_EXT)
 
 
+def find_columns_file(game: str, map_type: str) -> str:
+    """Returns the path of the columnar export for the provided type."""
+    return os.path.join(JSON_PATH, game, map_type + COLUMNS_EXT)
+
+
 def load_yaml_file(path: str) -> Any:
     """
     Loads a yaml file from the provided path
     and returns a python object.
     """
-    with open(path, encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    return load_yaml(path)
 
 
 def load_yaml_files(paths: list[str]) -> Generator[Any]:
@@ -62,6 +79,57 @@ def load_yaml_files(paths: list[str]) -> Generator[Any]:
         yield load_yaml_file(path)
 
 
+def iter_json_array(path: str, chunk_size: int = 0x10000) -> Generator[Any]:
+    """
+    Parses the top level array of a json file one element at a time
+    and returns a generator of objects.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+        started = False
+
+        def fill() -> None:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            eof = chunk == ""
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        while True:
+            # Skip whitespace and separators
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                if eof:
+                    raise ValueError(f"Unexpected end of json array in {path}")
+                fill()
+                continue
+            if not started:
+                if buf[pos] != "[":
+                    raise ValueError(f"Expected json array in {path}")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            if not eof and (end == len(buf) or buf[end] not in " \t\r\n,]"):
+                # A number could continue in the next chunk
+                fill()
+                continue
+            yield obj
+            pos = end
+
+
 def load_json_file(path: str) -> Any:
     """
     Loads each yaml file from the provided list of paths
@@ -77,20 +145,26 @@ def parse_obj_list(ylist: Any, map_type: str) -> InfoFile:
     map type and returns a list of InfoEntry.
     """
     assert isinstance(ylist, list)
+    from_obj = get_entry_parser(map_type)
+    return [from_obj(d) for d in ylist]
+
+
+def get_entry_parser(map_type: str) -> Callable[[Any], InfoEntry]:
+    """Returns the function that parses one entry of the provided map type."""
     if map_type == MAP_RAM:
-        return [DataEntry.from_obj(d) for d in ylist]
+        return DataEntry.from_obj
     elif map_type == MAP_CODE:
-        return [CodeEntry.from_obj(d) for d in ylist]
+        return CodeEntry.from_obj
     elif map_type == MAP_DATA:
-        return [DataEntry.from_obj(d) for d in ylist]
+        return DataEntry.from_obj
     elif map_type == MAP_STRUCTS:
-        return [StructEntry.from_obj(d) for d in ylist]
+        return StructEntry.from_obj
     elif map_type == MAP_UNIONS:
-        return [UnionEntry.from_obj(d) for d in ylist]
+        return UnionEntry.from_obj
     elif map_type == MAP_ENUMS:
-        return [EnumEntry.from_obj(d) for d in ylist]
+        return EnumEntry.from_obj
     elif map_type == MAP_TYPEDEFS:
-        return [TypedefEntry.from_obj(d) for d in ylist]
+        return TypedefEntry.from_obj
     raise ValueError(map_type)
 
 
@@ -110,41 +184,268 @@ def get_info_file_from_yaml(
     game: str,
     map_type: str,
     region: str = None,
-    include_unk: bool = False
+    include_unk: bool = False,
+    use_cache: bool = True
 ) -> InfoFile:
     """
     Finds, loads, and parses all yaml files of the provided type
     and returns them as a single sorted list of InfoEntry.
     """
-    # Load files and combine
     paths = find_yaml_files(game, map_type, include_unk)
-    ylists = load_yaml_files(paths)
-    ifiles = parse_obj_lists(ylists, map_type)
-    ifile = combine_info_files(ifiles)
-    # Filter by region
-    if region is not None:
-        ifile = [e for e in ifile if e.to_region(region)]
-    ifile.sort()
-    return ifile
+
+    def build() -> InfoFile:
+        # Load files and combine
+        ylists = load_yaml_files(paths)
+        ifiles = parse_obj_lists(ylists, map_type)
+        ifile = combine_info_files(ifiles)
+        # Filter by region
+        if region is not None:
+            ifile = [e for e in ifile if e.to_region(region)]
+        ifile.sort()
+        return ifile
+
+    if not use_cache:
+        return build()
+    source = "yaml_unk" if include_unk else "yaml"
+    name = f"{game}_{map_type}_{source}_{region or 'all'}"
+    return load_cached_info_file(name, paths, build)
 
 
 def get_info_file_from_json(
     game: str,
     map_type: str,
-    region: str = None
+    region: str = None,
+    use_cache: bool = True
 ) -> InfoFile:
     """
     Loads and parses the json file for the provided type
     and returns it as a sorted list of InfoEntry.
     """
-    # Load files and combine
-    path = os.path.join(JSON_PATH, game, map_type + JSON_EXT)
-    obj_list = load_json_file(path)
-    ifile = parse_obj_list(obj_list, map_type)
-    # Filter by region
+    path = find_json_file(game, map_type)
+
+    def build() -> InfoFile:
+        ifile = []
+        in_order = True
+        for entry in iter_info_file_from_json(game, map_type, region):
+            if in_order and len(ifile) > 0 and entry < ifile[-1]:
+                in_order = False
+            ifile.append(entry)
+        # Json files are written sorted, so this is rarely needed
+        if not in_order:
+            ifile.sort()
+        return ifile
+
+    if not use_cache:
+        return build()
+    name = f"{game}_{map_type}_json_{region or 'all'}"
+    return load_cached_info_file(name, [path], build)
+
+
+def iter_info_file_from_json(
+    game: str,
+    map_type: str,
+    region: str = None
+) -> Generator[InfoEntry]:
+    """
+    Parses the json file for the provided type one entry at a time and
+    returns a generator of InfoEntry in file order. Entries not in the
+    region are skipped before they are parsed.
+    """
+    objs = iter_json_array(find_json_file(game, map_type))
+    return iter_info_entries(objs, map_type, region)
+
+
+def iter_info_entries(
+    objs: Iterable[Any],
+    map_type: str,
+    region: str = None
+) -> Generator[InfoEntry]:
+    """
+    Parses json objects of the provided type and returns a generator of
+    InfoEntry. Entries not in the region are skipped before they are parsed.
+    """
+    from_obj = get_entry_parser(map_type)
+    for obj in objs:
+        if region is not None:
+            addr = obj.get(K_ADDR)
+            if isinstance(addr, dict) and region not in addr:
+                continue
+        entry = from_obj(obj)
+        if region is None or entry.to_region(region):
+            yield entry
+
+
+def get_info_file_from_columns(
+    game: str,
+    map_type: str,
+    region: str = None,
+    use_cache: bool = True
+) -> InfoFile:
+    """
+    Loads and parses the columnar export for the provided type
+    and returns it as a sorted list of InfoEntry.
+    """
+    path = find_columns_file(game, map_type)
+
+    def build() -> InfoFile:
+        ifile = parse_info_columns(InfoColumns.load(path), map_type, region)
+        ifile.sort()
+        return ifile
+
+    if not use_cache:
+        return build()
+    name = f"{game}_{map_type}_columns_{region or 'all'}"
+    return load_cached_info_file(name, [path], build)
+
+
+def _named_vars_from_columns(columns: InfoColumns) -> list[NamedVarEntry]:
+    col = columns.column
+    rows = zip(
+        col(K_NAME), col(K_DESC), col(K_TYPE), col(K_COUNT),
+        col(K_CAT), col(K_COMP), col(K_ENUM)
+    )
+    return [
+        NamedVarEntry(
+            name, desc, type, parse_region_int(count),
+            STR_TO_CAT[cat] if cat else None,
+            STR_TO_COMP[comp] if comp else None,
+            enum
+        )
+        for name, desc, type, count, cat, comp, enum in rows
+    ]
+
+
+def _struct_vars_from_columns(columns: InfoColumns) -> list[StructVarEntry]:
+    col = columns.column
+    rows = zip(
+        col(K_NAME), col(K_DESC), col(K_TYPE), col(K_COUNT), col(K_OFFSET),
+        col(K_BITS), col(K_CAT), col(K_COMP), col(K_ENUM)
+    )
+    return [
+        StructVarEntry(
+            name, desc, type, parse_region_int(count), parse_region_int(offset),
+            bits,
+            STR_TO_CAT[cat] if cat else None,
+            STR_TO_COMP[comp] if comp else None,
+            enum
+        )
+        for name, desc, type, count, offset, bits, cat, comp, enum in rows
+    ]
+
+
+def _enum_vals_from_columns(columns: InfoColumns) -> list[EnumValEntry]:
+    col = columns.column
+    rows = zip(col(K_NAME), col(K_DESC), col(K_VAL))
+    return [
+        EnumValEntry(name, desc, parse_region_int(val))
+        for name, desc, val in rows
+    ]
+
+
+def parse_info_columns(
+    columns: InfoColumns,
+    map_type: str,
+    region: str = None
+) -> InfoFile:
+    """
+    Builds the entries of the provided type straight from the columns,
+    without making a json object for each one. Entries not in the region
+    are skipped before they are built.
+    """
+    col = columns.column
+    if map_type in (MAP_RAM, MAP_DATA):
+        addrs = col(K_ADDR)
+        rows = zip(
+            col(K_NAME), col(K_DESC), col(K_TYPE), col(K_COUNT), addrs,
+            col(K_LOC), col(K_CAT), col(K_COMP), col(K_ENUM), col(K_SIZE)
+        )
+        ifile = [
+            DataEntry(
+                name, desc, type, parse_region_int(count),
+                parse_region_int(addr), loc,
+                STR_TO_CAT[cat] if cat else None,
+                STR_TO_COMP[comp] if comp else None,
+                enum, parse_region_int(size)
+            )
+            for name, desc, type, count, addr, loc, cat, comp, enum, size in rows
+            if region is None or not isinstance(addr, dict) or region in addr
+        ]
+    elif map_type == MAP_CODE:
+        addrs = col(K_ADDR)
+        rows = zip(
+            col(K_NAME), col(K_DESC), addrs, col(K_SIZE), col(K_MODE),
+            col(K_PARAMS, _named_vars_from_columns), col(K_RETURN), col(K_LOC)
+        )
+        ifile = [
+            CodeEntry(
+                name, desc, parse_region_int(addr), parse_region_int(size),
+                STR_TO_MODE[mode],
+                params or None,
+                VarEntry.from_obj(ret) if ret else None,
+                loc
+            )
+            for name, desc, addr, size, mode, params, ret, loc in rows
+            if region is None or not isinstance(addr, dict) or region in addr
+        ]
+    elif map_type == MAP_STRUCTS:
+        rows = zip(
+            col(K_NAME), col(K_DESC), col(K_SIZE),
+            col(K_VARS, _struct_vars_from_columns), col(K_LOC)
+        )
+        ifile = [
+            StructEntry(name, desc, parse_region_int(size), vars, loc)
+            for name, desc, size, vars, loc in rows
+        ]
+    elif map_type == MAP_ENUMS:
+        rows = zip(
+            col(K_NAME), col(K_DESC), col(K_VALS, _enum_vals_from_columns),
+            col(K_LOC)
+        )
+        ifile = [
+            EnumEntry(name, desc, vals, loc)
+            for name, desc, vals, loc in rows
+        ]
+    else:
+        return list(iter_info_entries(columns.to_objs(), map_type, region))
     if region is not None:
         ifile = [e for e in ifile if e.to_region(region)]
-    ifile.sort()
+    return ifile
+
+
+def _source_key(paths: list[str]) -> tuple:
+    """Identifies the current version of the source files by path, mtime, and size."""
+    key = []
+    for path in sorted(paths):
+        stat = os.stat(path)
+        key.append((os.path.abspath(path), stat.st_mtime_ns, stat.st_size))
+    return (INFO_CACHE_VERSION, tuple(key))
+
+
+def load_cached_info_file(
+    name: str,
+    paths: list[str],
+    build: Callable[[], InfoFile]
+) -> InfoFile:
+    """
+    Returns the parsed info file cached under the provided name if none of
+    its source files changed since it was cached. Otherwise builds it and
+    updates the cache.
+    """
+    key = _source_key(paths)
+    cache_path = os.path.join(INFO_CACHE_PATH, name + ".pickle")
+    try:
+        with open(cache_path, "rb") as f:
+            cached_key, ifile = pickle.load(f)
+        if cached_key == key:
+            return ifile
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+        pass
+    ifile = build()
+    os.makedirs(INFO_CACHE_PATH, exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((key, ifile), f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
     return ifile
 
 
@@ -0,0 +1,183 @@
+from info.asset_type import AssetType, ArrayType, PointerType, SpecifierType, TypeSpecKind
+from info.info_entry import NamedVarEntry, StructEntry, UnionEntry
+from info.type_resolver import TypeResolver
+
+
+class LayoutSlot:
+    """
+    A primitive (or pointer) at a fixed place in a flattened layout.
+    var is the innermost field holding it, or None for the laid out type
+    itself, and num is the element of that field's array it belongs to.
+    """
+
+    __slots__ = ("path", "var", "num", "offset", "size", "is_ptr")
+
+    def __init__(self,
+        path: tuple[str, ...],
+        var: NamedVarEntry,
+        num: int,
+        offset: int,
+        size: int,
+        is_ptr: bool
+    ):
+        self.path = path
+        self.var = var
+        self.num = num
+        self.offset = offset
+        self.size = size
+        self.is_ptr = is_ptr
+
+    def __str__(self) -> str:
+        return f"{self.offset:X} {'.'.join(self.path)}"
+
+
+class Layout:
+    """
+    Byte offset -> primitive table for one element of a type. Each byte
+    of a primitive maps to the same slot, and padding maps to None.
+    """
+
+    __slots__ = ("slots", "fields")
+
+    def __init__(self, size: int):
+        self.slots: list[LayoutSlot] = [None] * size
+        # Every slot added, in order, including ones hidden by overlaps
+        self.fields: list[LayoutSlot] = []
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def at(self, offset: int) -> LayoutSlot:
+        """Returns the slot covering the offset, or None for padding."""
+        if 0 <= offset < len(self.slots):
+            return self.slots[offset]
+        return None
+
+    def fill(self, slot: LayoutSlot) -> None:
+        # Earlier fields keep overlapping bytes (union members, bitfields)
+        self.fields.append(slot)
+        slots = self.slots
+        for i in range(slot.offset, min(slot.offset + slot.size, len(slots))):
+            if slots[i] is None:
+                slots[i] = slot
+
+    def ptr_offsets(self) -> list[int]:
+        """Returns the offsets of every pointer in the layout."""
+        return [s.offset for s in self.fields if s.is_ptr and self.slots[s.offset] is s]
+
+
+class StructLayouts:
+    """
+    Flattens structs, unions and other types into Layouts, following
+    arrays and nested structs, and caches them so each is built once.
+    Union members overlap, so the first member covering a byte wins.
+    """
+
+    def __init__(self,
+        structs: dict[str, StructEntry],
+        unions: dict[str, UnionEntry],
+        resolver: TypeResolver
+    ):
+        self.structs = structs
+        self.unions = unions
+        self.resolver = resolver
+        self._type_layouts: dict[AssetType, Layout] = {}
+        self._struct_layouts: dict[str, Layout] = {}
+        self._union_layouts: dict[str, Layout] = {}
+
+    def struct_layout(self, name: str) -> Layout:
+        layout = self._struct_layouts.get(name)
+        if layout is None:
+            entry = self.structs[name]
+            layout = self._build(entry.size, entry.vars, True)
+            self._struct_layouts[name] = layout
+        return layout
+
+    def union_layout(self, name: str) -> Layout:
+        layout = self._union_layouts.get(name)
+        if layout is None:
+            entry = self.unions[name]
+            layout = self._build(entry.size, entry.vars, False)
+            self._union_layouts[name] = layout
+        return layout
+
+    def type_layout(self, type: AssetType) -> Layout:
+        """Returns the layout of one value of the type."""
+        layout = self._type_layouts.get(type)
+        if layout is None:
+            base, count = self._element(type)
+            aggregate = self._aggregate_layout(base)
+            if aggregate is not None and count == 1:
+                layout = aggregate
+            else:
+                layout = Layout(self.resolver.size_of(type))
+                self._add(layout, (), None, 1, 0, type)
+            self._type_layouts[type] = layout
+        return layout
+
+    def _build(self, size: int, vars: list[NamedVarEntry], is_struct: bool) -> Layout:
+        layout = Layout(size)
+        for var in vars:
+            # Fields of unsupported types are left as padding
+            if var.type is None:
+                continue
+            offset = var.offset if is_struct else 0
+            self._add(layout, (var.name,), var, var.get_count(), offset, var.type)
+        return layout
+
+    def _add(self,
+        layout: Layout,
+        path: tuple[str, ...],
+        var: NamedVarEntry,
+        count: int,
+        offset: int,
+        type: AssetType
+    ) -> None:
+        """Adds count values of the type at offset, flattening arrays."""
+        base, inner_count = self._element(type)
+        count *= inner_count
+        size = self.resolver.size_of(base)
+        aggregate = self._aggregate_layout(base)
+        if aggregate is None:
+            is_ptr = isinstance(base, PointerType)
+            for num in range(count):
+                layout.fill(LayoutSlot(path, var, num, offset + num * size, size, is_ptr))
+            return
+        for num in range(count):
+            start = offset + num * size
+            elem_path = path
+            if count > 1:
+                name = path[-1] if path else ""
+                elem_path = path[:-1] + (f"{name}[{num}]",)
+            for slot in aggregate.fields:
+                layout.fill(LayoutSlot(
+                    elem_path + slot.path,
+                    slot.var,
+                    slot.num,
+                    start + slot.offset,
+                    slot.size,
+                    slot.is_ptr
+                ))
+
+    def _element(self, type: AssetType) -> tuple[AssetType, int]:
+        """Strips typedefs and arrays, returning the element type and count."""
+        count = 1
+        while True:
+            if isinstance(type, ArrayType):
+                count *= type.size
+                type = type.inner_type
+            elif isinstance(type, SpecifierType) and type.kind == TypeSpecKind.TYPEDEF:
+                name = type.spec_name()
+                if name not in self.resolver.typedefs:
+                    raise ValueError(f"Invalid typedef name {name}")
+                type = self.resolver.typedefs[name]
+            else:
+                return type, count
+
+    def _aggregate_layout(self, type: AssetType) -> Layout:
+        if isinstance(type, SpecifierType):
+            if type.kind == TypeSpecKind.STRUCT:
+                return self.struct_layout(type.spec_name())
+            if type.kind == TypeSpecKind.UNION:
+                return self.union_layout(type.spec_name())
+        return None
@@ -0,0 +1,86 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from info.asset_type import AssetType, ArrayType, SpecifierType, TypeSpecKind
+
+
+class TypeResolver:
+    """
+    Computes and caches the size and alignment of types for one game.
+    Parsed types are shared between entries, so answers are cached by
+    type object, and each typedef name is resolved once.
+    """
+
+    def __init__(self, sizes: dict[str, int], typedefs: dict[str, AssetType]):
+        self.sizes = sizes
+        self.typedefs = typedefs
+        self._type_sizes: dict[AssetType, int] = {}
+        self._type_aligns: dict[AssetType, int] = {}
+        self._typedef_sizes: dict[str, int] = {}
+        self._typedef_aligns: dict[str, int] = {}
+        # Typedef names being resolved, to detect cycles
+        self._resolving: set[str] = set()
+
+    def resolve_all(self) -> None:
+        """
+        Resolves the layout of every typedef up front. Typedefs without a
+        layout (enums and functions) are skipped and raise when used.
+        """
+        for name in self.typedefs:
+            try:
+                self._typedef_size(name)
+                self._typedef_alignment(name)
+            except ValueError:
+                pass
+
+    def size_of(self, type: AssetType) -> int:
+        size = self._type_sizes.get(type)
+        if size is None:
+            if isinstance(type, SpecifierType) and type.kind == TypeSpecKind.TYPEDEF:
+                size = self._typedef_size(type.spec_name())
+            elif isinstance(type, ArrayType):
+                size = type.size * self.size_of(type.inner_type)
+            else:
+                size = type.get_size(self.sizes, self.typedefs)
+            self._type_sizes[type] = size
+        return size
+
+    def alignment_of(self, type: AssetType) -> int:
+        align = self._type_aligns.get(type)
+        if align is None:
+            if isinstance(type, SpecifierType) and type.kind == TypeSpecKind.TYPEDEF:
+                align = self._typedef_alignment(type.spec_name())
+            elif isinstance(type, ArrayType):
+                align = self.alignment_of(type.inner_type)
+            else:
+                align = type.get_alignment(self.typedefs)
+            self._type_aligns[type] = align
+        return align
+
+    def _typedef_size(self, name: str) -> int:
+        size = self._typedef_sizes.get(name)
+        if size is None:
+            with self._resolving_typedef(name) as type:
+                size = self.size_of(type)
+            self._typedef_sizes[name] = size
+        return size
+
+    def _typedef_alignment(self, name: str) -> int:
+        align = self._typedef_aligns.get(name)
+        if align is None:
+            with self._resolving_typedef(name) as type:
+                align = self.alignment_of(type)
+            self._typedef_aligns[name] = align
+        return align
+
+    @contextmanager
+    def _resolving_typedef(self, name: str) -> Iterator[AssetType]:
+        if name not in self.typedefs:
+            raise ValueError(f"Invalid typedef name {name}")
+        if name in self._resolving:
+            raise ValueError(f"Typedef {name} refers to itself")
+        self._resolving.add(name)
+        try:
+            yield self.typedefs[name]
+        finally:
+            self._resolving.discard(name)
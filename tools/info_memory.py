@@ -0,0 +1,82 @@
+import argparse
+import gc
+import json
+import tracemalloc
+
+from constants import *
+from info.asset_type import parse_type
+from info.game_info import GameInfo, InfoSource
+
+
+INFO_MAPS = ("ram", "code", "data", "structs", "enums", "unions", "typedefs")
+
+
+def measure_game(game: str, region: str, source: InfoSource) -> dict[str, int]:
+    """
+    Loads each map of the game's info without the on-disk cache and
+    returns the bytes still allocated for it after loading (0 if the map
+    has no data file, which GameInfo loads as empty).
+    """
+    info = GameInfo(game, region, source, use_cache=False)
+    results = {}
+    for map_type in INFO_MAPS:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            entries = getattr(info, map_type)
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        results[map_type] = current if entries else 0
+    return results
+
+
+def print_results(
+    results: dict[str, dict[str, int]],
+    baseline: dict[str, dict[str, int]] = None
+) -> None:
+    for game, maps in results.items():
+        print(game)
+        for map_type, size in maps.items():
+            line = f"  {map_type:<10}{size // 1024:>8} KB"
+            if baseline is not None and baseline.get(game, {}).get(map_type):
+                before = baseline[game][map_type]
+                line += f"{before // 1024:>8} KB before ({size / before - 1:+.0%})"
+            print(line)
+        total = sum(maps.values())
+        print(f"  {'total':<10}{total // 1024:>8} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measures the memory held by loaded game info")
+    parser.add_argument("-g", "--game", type=str, choices=GAMES,
+        help="Only measure this game")
+    parser.add_argument("-r", "--region", type=str, choices=REGIONS,
+        default=REGION_U)
+    parser.add_argument("-y", "--yaml", action="store_true",
+        help="Load from yaml instead of json")
+    parser.add_argument("-c", "--columns", action="store_true",
+        help="Load from the columnar export instead of json")
+    parser.add_argument("-o", "--output", type=str,
+        help="Save results to a json file")
+    parser.add_argument("-b", "--baseline", type=str,
+        help="Compare against results saved with -o (e.g. from another revision)")
+
+    args = parser.parse_args()
+    source = InfoSource.JSON
+    if args.yaml:
+        source = InfoSource.YAML
+    elif args.columns:
+        source = InfoSource.COLUMNS
+    games = [args.game] if args.game else GAMES
+    results = {game: measure_game(game, args.region, source) for game in games}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+    print(parse_type.cache_info())
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,174 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+
+import argparse_utils as apu
+from compress import is_lz77
+from rom import Rom
+
+
+LZ_TABLE_VERSION = 1
+# Largest decompressed size considered plausible (all of EWRAM)
+MAX_DECOMP_SIZE = 0x40000
+
+_worker_rom: Rom = None
+
+
+def _init_worker(rom_path: str) -> None:
+    global _worker_rom
+    _worker_rom = Rom(rom_path, use_mmap=True)
+
+
+def _file_matches(rom: Rom) -> bool:
+    """
+    Returns whether the ROM's file still holds the image in memory, since
+    workers reopen it by path.
+    """
+    try:
+        with Rom(rom.path, use_mmap=True) as on_disk:
+            return on_disk.sha1() == rom.sha1()
+    except (OSError, ValueError):
+        return False
+
+
+def _check_offsets(data: bytes, offsets: list[int]) -> list[int]:
+    """Returns the compressed size of the stream at each offset, or -1."""
+    sizes = []
+    for offset in offsets:
+        try:
+            sizes.append(is_lz77(data, offset))
+        except IndexError:
+            # Ran off the end of the ROM
+            sizes.append(-1)
+    return sizes
+
+
+def _check_chunk(offsets: list[int]) -> list[int]:
+    return _check_offsets(_worker_rom.data, offsets)
+
+
+class LzTable:
+    """
+    Table of every LZ77 stream starting at an aligned offset in the data
+    region, sorted by offset. Streams that start inside an earlier stream
+    are left out, since they are almost always part of its data.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.offsets = arrays["offsets"]
+        self.comp_sizes = arrays["comp_sizes"]
+        self.decomp_sizes = arrays["decomp_sizes"]
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @staticmethod
+    def candidates(rom: Rom, start: int, end: int) -> np.ndarray:
+        """
+        Returns the aligned offsets in [start, end) with a plausible LZ77
+        header: the 0x10 flag, a nonzero size, and a literal first.
+        """
+        words = rom.words32_range(start, end)
+        sizes = words >> 8
+        mask = ((words & 0xFF) == 0x10) & (sizes > 0) & (sizes <= MAX_DECOMP_SIZE)
+        offsets = start + np.flatnonzero(mask) * 4
+        # The first block can't begin with a back-reference
+        flags = rom.words32()[offsets // 4 + 1] & 0xFF
+        return offsets[(flags & 0x80) == 0]
+
+    @classmethod
+    def build(cls, rom: Rom, processes: int = None, chunk_size: int = 1024) -> "LzTable":
+        start = rom.data_start()
+        offsets = cls.candidates(rom, start, rom.data_end()).tolist()
+        if processes == 1 or not _file_matches(rom):
+            comp_sizes = _check_offsets(rom.data, offsets)
+        else:
+            chunks = [offsets[i:i + chunk_size] for i in range(0, len(offsets), chunk_size)]
+            comp_sizes = []
+            with ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=_init_worker,
+                initargs=(rom.path,)
+            ) as executor:
+                for sizes in executor.map(_check_chunk, chunks):
+                    comp_sizes += sizes
+
+        # Keep valid streams that don't start inside the previous one
+        streams = []
+        prev_end = start
+        for offset, comp_size in zip(offsets, comp_sizes):
+            if comp_size > 0 and offset >= prev_end:
+                decomp_size = rom.read_32(offset) >> 8
+                streams.append((offset, comp_size, decomp_size))
+                prev_end = offset + comp_size
+        table = np.array(streams, dtype=np.uint32).reshape(-1, 3)
+        return cls({
+            "offsets": table[:, 0],
+            "comp_sizes": table[:, 1],
+            "decomp_sizes": table[:, 2]
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "LzTable":
+        with np.load(path) as f:
+            if int(f["version"]) != LZ_TABLE_VERSION:
+                raise ValueError("Outdated LZ77 table")
+            return cls({k: f[k] for k in f.files if k != "version"})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=LZ_TABLE_VERSION, **vars(self))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def for_rom(cls, rom: Rom, use_cache: bool = True, processes: int = None) -> "LzTable":
+        """Loads the LZ77 table for the ROM from the cache, building it if needed."""
+        path = rom.cache_path("lz", ".npz")
+        if use_cache and os.path.isfile(path):
+            try:
+                return cls.load(path)
+            except (OSError, ValueError, KeyError):
+                pass
+        table = cls.build(rom, processes)
+        if use_cache:
+            table.save(path)
+        return table
+
+    def streams(self) -> list[tuple[int, int, int]]:
+        """Returns (offset, comp_size, decomp_size) for every stream."""
+        return list(zip(
+            self.offsets.tolist(),
+            self.comp_sizes.tolist(),
+            self.decomp_sizes.tolist()
+        ))
+
+    def stream_at(self, addr: int) -> tuple[int, int] | None:
+        """Returns (comp_size, decomp_size) of the stream starting at addr."""
+        i = int(np.searchsorted(self.offsets, addr))
+        if i < len(self.offsets) and self.offsets[i] == addr:
+            return int(self.comp_sizes[i]), int(self.decomp_sizes[i])
+        return None
+
+    def stream_containing(self, addr: int) -> tuple[int, int, int] | None:
+        """Returns (offset, comp_size, decomp_size) of the stream covering addr."""
+        i = int(np.searchsorted(self.offsets, addr, "right")) - 1
+        if i >= 0 and addr < int(self.offsets[i]) + int(self.comp_sizes[i]):
+            return int(self.offsets[i]), int(self.comp_sizes[i]), int(self.decomp_sizes[i])
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    apu.add_arg(parser, apu.ArgType.ROM_PATH)
+    parser.add_argument("-p", "--processes", type=int,
+        help="Number of worker processes")
+
+    args = parser.parse_args()
+    rom = apu.get_rom(args.rom_path, True)
+    table = LzTable.for_rom(rom, processes=args.processes)
+    for offset, comp_size, decomp_size in table.streams():
+        print(f"{offset:X}\t{comp_size:X}\t{decomp_size:X}")
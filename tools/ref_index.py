@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+
+from rom import Rom
+
+
+REF_INDEX_VERSION = 1
+
+
+class RefIndex:
+    """
+    Reverse index from a referenced value to every place in the ROM that
+    refers to it: bl instructions, literal pool words (with the ldr
+    instructions that load them), and words in the data region.
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        # Each group is sorted by value, then by referencing address
+        self.bl_targets = arrays["bl_targets"]
+        self.bl_addrs = arrays["bl_addrs"]
+        self.pool_vals = arrays["pool_vals"]
+        self.pool_ldrs = arrays["pool_ldrs"]
+        self.pool_addrs = arrays["pool_addrs"]
+        self.data_vals = arrays["data_vals"]
+        self.data_addrs = arrays["data_addrs"]
+
+    @classmethod
+    def build(cls, rom: Rom) -> "RefIndex":
+        code_start = rom.code_start()
+        code_end = rom.code_end()
+        data_end = rom.data_end()
+        halfs = rom.words16()
+        words = rom.words32()
+        # Decode every halfword in code, the same way a linear scan would
+        idxs = np.arange(code_start // 2, code_end // 2)
+        vals = halfs[idxs].astype(np.int64)
+        addrs = idxs * 2
+
+        # ldr Rd,[pc,#imm]
+        ld = np.flatnonzero((vals >> 11) == 0b01001)
+        pool_ldrs = addrs[ld]
+        pool_addrs = ((pool_ldrs + 4) & ~2) + (vals[ld] & 0xFF) * 4
+        pool_vals = words[pool_addrs // 4].astype(np.int64)
+        order = np.lexsort((pool_ldrs, pool_vals))
+
+        # bl (both halves are combined per site)
+        bl = np.flatnonzero((vals >> 12) == 0xF)
+        bl_addrs = addrs[bl]
+        hi = vals[bl] & 0x7FF
+        lo = halfs[idxs[bl] + 1].astype(np.int64) & 0x7FF
+        off = (hi << 11) | lo
+        off = np.where(off >= 1 << 21, off - (1 << 22), off)
+        bl_targets = bl_addrs + 4 + off * 2
+        bl_order = np.lexsort((bl_addrs, bl_targets))
+
+        # Every aligned word in data
+        data_vals = rom.words32_range(code_end, data_end)
+        data_order = np.argsort(data_vals, kind="stable")
+
+        return cls({
+            "bl_targets": bl_targets[bl_order],
+            "bl_addrs": bl_addrs[bl_order],
+            "pool_vals": pool_vals[order],
+            "pool_ldrs": pool_ldrs[order],
+            "pool_addrs": pool_addrs[order],
+            "data_vals": data_vals[data_order],
+            "data_addrs": (code_end + data_order * 4).astype(np.uint32)
+        })
+
+    @classmethod
+    def load(cls, path: str) -> "RefIndex":
+        with np.load(path) as f:
+            if int(f["version"]) != REF_INDEX_VERSION:
+                raise ValueError("Outdated reference index")
+            return cls({k: f[k] for k in f.files if k != "version"})
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {k: v for k, v in vars(self).items()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, version=REF_INDEX_VERSION, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def for_rom(cls, rom: Rom, use_cache: bool = True) -> "RefIndex":
+        """Loads the index for the ROM from the cache, building it if needed."""
+        path = rom.cache_path("refs", ".npz")
+        if use_cache and os.path.isfile(path):
+            try:
+                return cls.load(path)
+            except (OSError, ValueError, KeyError):
+                pass
+        index = cls.build(rom)
+        if use_cache:
+            index.save(path)
+        return index
+
+    @staticmethod
+    def _lookup(keys: np.ndarray, val: int) -> slice:
+        limits = np.iinfo(keys.dtype)
+        if val < limits.min or val > limits.max:
+            return slice(0, 0)
+        left = np.searchsorted(keys, val, "left")
+        right = np.searchsorted(keys, val, "right")
+        return slice(left, right)
+
+    def bl_sites(self, target: int) -> list[int]:
+        """Returns the address of every bl that branches to target."""
+        s = self._lookup(self.bl_targets, target)
+        return self.bl_addrs[s].tolist()
+
+    def pool_sites(self, val: int) -> dict[int, list[int]]:
+        """
+        Returns each pool address containing val, mapped to the addresses
+        of the ldr instructions that load it. Pools are ordered by their
+        first ldr.
+        """
+        s = self._lookup(self.pool_vals, val)
+        pools: dict[int, list[int]] = {}
+        for pool, ldr in zip(self.pool_addrs[s].tolist(), self.pool_ldrs[s].tolist()):
+            if pool not in pools:
+                pools[pool] = []
+            pools[pool].append(ldr)
+        return pools
+
+    def data_sites(self, val: int) -> list[int]:
+        """Returns the address of every aligned data word equal to val."""
+        s = self._lookup(self.data_vals, val)
+        return self.data_addrs[s].tolist()
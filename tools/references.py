@@ -5,11 +5,12 @@ from typing import Any
 import yaml
 
 import argparse_utils as apu
-from function import all_functions
+from code_model import CodeModel
+from constants import MAP_CODE, MAP_DATA
 from info.game_info import GameInfo, InfoSource
 from info.info_entry import InfoEntry, CodeEntry, DataEntry
+from ref_index import RefIndex
 from rom import Rom, SIZE_32MB, ROM_OFFSET, ROM_END
-from thumb import ThumbForm, ThumbInstruct
 
 
 class RefType(Enum):
@@ -138,12 +139,19 @@ class References(object):
         self.rom = rom
         source = InfoSource.YAML_UNK if include_unk else InfoSource.JSON
         self.info = GameInfo(rom.game, rom.region, source)
+        self.index: RefIndex = None
+
+    def get_index(self) -> RefIndex:
+        """Returns the reverse reference index, loading or building it once."""
+        if self.index is None:
+            self.index = RefIndex.for_rom(self.rom)
+        return self.index
 
     def find(self, addr: int) -> tuple[list[BlRef], list[PoolRef], list[DataRef]]:
         rom = self.rom
         code_start = rom.code_start()
         code_end = rom.code_end()
-        data_end = rom.data_end()
+        index = self.get_index()
 
         # Check if address has rom offset
         if addr >= ROM_OFFSET and addr < ROM_END:
@@ -159,41 +167,32 @@ class References(object):
                 in_code = True
 
         bl_refs = []
-        pool_refs = {}
+        pool_refs = []
         data_refs = []
 
         # Check bl and ldr in code
-        self.entries = self.info.code
+        self.entries_type = MAP_CODE
         addr_val = addr
         if in_rom:
             addr_val += ROM_OFFSET
             if in_code:
                 addr_val += 1
-        for i in range(code_start, code_end, 2):
-            inst = ThumbInstruct(rom, i)
-            if inst.format == ThumbForm.LdPC:
-                pool_addr = inst.pc_rel_addr()
-                val = rom.read_32(pool_addr)
-                if addr_val == val:
-                    ref = pool_refs.get(pool_addr)
-                    if ref is None:
-                        ref = self.get_ref(pool_addr, RefType.POOL)
-                        pool_refs[pool_addr] = ref
-                    ref.ldrs.append(i)
-            elif in_code and inst.format == ThumbForm.Link:
-                if addr == inst.branch_addr():
-                    ref = self.get_ref(i, RefType.BL)
-                    bl_refs.append(ref)
+        for pool_addr, ldrs in index.pool_sites(addr_val).items():
+            ref = self.get_ref(pool_addr, RefType.POOL)
+            ref.ldrs += ldrs
+            pool_refs.append(ref)
+        if in_code:
+            for i in index.bl_sites(addr):
+                ref = self.get_ref(i, RefType.BL)
+                bl_refs.append(ref)
 
         # Check data
-        self.entries = self.info.data
-        for i in range(code_end, data_end, 4):
-            val = rom.read_32(i)
-            if addr_val == val:
-                ref = self.get_ref(i, RefType.DATA)
-                data_refs.append(ref)
+        self.entries_type = MAP_DATA
+        for i in index.data_sites(addr_val):
+            ref = self.get_ref(i, RefType.DATA)
+            data_refs.append(ref)
         
-        return bl_refs, list(pool_refs.values()), data_refs
+        return bl_refs, pool_refs, data_refs
 
     def find_all(self) -> list[tuple[str, list[Ref]]]:
         # TODO: Pass refs instead of putting it on self?
@@ -202,13 +201,10 @@ class References(object):
         rom = self.rom
 
         # Check every ref in code
-        self.entries = self.info.code
-        for func in all_functions(rom):
+        self.entries_type = MAP_CODE
+        for func in CodeModel.for_rom(rom).functions():
             # Check for bl
-            for addr, inst in func.instructs.items():
-                if inst.format != ThumbForm.Link:
-                    continue
-                bl_addr = inst.branch_addr()
+            for addr, bl_addr in func.bls:
                 if bl_addr >= func.start_addr and bl_addr < func.end_addr:
                     continue
                 self.add_ref(bl_addr, addr, RefType.BL)
@@ -217,12 +213,12 @@ class References(object):
                 self.check_addr(addr, RefType.POOL)
 
         # Check every ref in data
-        self.entries = self.info.data
+        self.entries_type = MAP_DATA
         data_start = rom.data_start()
         data_end = rom.data_end()
-        self.entries.append(DataEntry(None, None, "u8", 1, data_end))
-        for i in range(data_start, data_end, 4):
-            self.check_addr(i, RefType.DATA)
+        addrs, vals = rom.ptr_words(data_start, data_end)
+        for addr, val in zip(addrs.tolist(), vals.tolist()):
+            self.add_ptr_ref(val, addr, RefType.DATA)
         
         # Get all code and data names
         entry_names = {}
@@ -238,11 +234,15 @@ class References(object):
         """Checks if an address contains a valid reference."""
         val = self.rom.read_32(addr)
         if val >= self.rom.code_start(True) and val < self.rom.data_end(True):
-            val -= ROM_OFFSET
-            if val < self.rom.code_end() and val % 4 == 1:
-                # Subtract one for thumb code pointers
-                val -= 1
-            self.add_ref(val, addr, kind)
+            self.add_ptr_ref(val, addr, kind)
+
+    def add_ptr_ref(self, val: int, addr: int, kind: RefType) -> None:
+        """Adds a reference for a pointer value known to be in the ROM."""
+        val -= ROM_OFFSET
+        if val < self.rom.code_end() and val % 4 == 1:
+            # Subtract one for thumb code pointers
+            val -= 1
+        self.add_ref(val, addr, kind)
 
     def add_ref(self, val: int, addr: int, kind: RefType) -> None:
         """Creates and adds the reference at the given address."""
@@ -252,18 +252,8 @@ class References(object):
         self.found_refs[val].append(ref)
 
     def get_prev_entry(self, addr: int) -> InfoEntry:
-        """Binary search to find the first entry <= addr"""
-        left = 0
-        right = len(self.entries) - 1
-        result = None
-        while left <= right:
-            mid = (left + right) // 2
-            if self.entries[mid].addr <= addr:
-                result = self.entries[mid]
-                left = mid + 1
-            else:
-                right = mid - 1
-        return result
+        """Finds the last entry <= addr"""
+        return self.info.get_prev_entry(self.entries_type, addr)
 
     def get_ref(self, addr: int, kind: RefType) -> Ref:
         # Get closest entry before address
@@ -309,7 +299,7 @@ class References(object):
     
     def get_data_ref(self, addr: int, entry: DataEntry) -> DataRef:
         if entry is not None:
-            length = entry.get_size(self.info.sizes, self.info.types)
+            length = self.info.get_entry_size(entry)
             offset = self.get_offset_within_entry(addr, entry.addr, length)
             if offset != -1:
                 count = entry.get_count()
@@ -352,7 +342,7 @@ if __name__ == "__main__":
     parser.add_argument("-u", "--unk", action="store_true")
 
     args = parser.parse_args()
-    rom = apu.get_rom(args.rom_path)
+    rom = apu.get_rom(args.rom_path, True)
     refs = References(rom, args.unk)
 
     if args.all:
@@ -2,6 +2,8 @@ import argparse
 from collections import defaultdict
 from enum import Enum, auto
 
+import numpy as np
+
 import argparse_utils as apu
 from rom import Rom, ROM_OFFSET
 
@@ -25,21 +27,16 @@ class PtrReplacement(Enum):
 def replace_ptrs_count(rom: Rom):
     start = rom.code_start()
     end = rom.data_end()
-    rom_start = start + ROM_OFFSET
-    rom_end = end + ROM_OFFSET
+    is_ptr = rom.ptr_mask(start, end)
+    # Count pointers since the last non-pointer word
+    idxs = np.arange(len(is_ptr))
+    run_starts = np.maximum.accumulate(np.where(is_ptr, 0, idxs + 1))
+    counts = (idxs - run_starts).astype(np.uint32)
+    # Replace pointers with "ptr" and count
     data = bytearray(rom.data)
-    ptr_count = 0
-    for i in range(start, end, 4):
-        val = rom.read_32(i)
-        if val >= rom_start and val < rom_end:
-            # Replace pointer with "ptr" and count
-            data[i] = 0x70
-            data[i + 1] = 0x74
-            data[i + 2] = 0x72
-            data[i + 3] = ptr_count & 0xFF
-            ptr_count += 1
-        else:
-            ptr_count = 0
+    words = np.frombuffer(data, dtype="<u4")
+    ptrs = words[start // 4:end // 4]
+    ptrs[is_ptr] = 0x727470 | ((counts[is_ptr] & 0xFF) << 24)
     rom.data = data
 
 
@@ -124,8 +121,8 @@ if __name__ == "__main__":
     apu.add_arg(parser, apu.ArgType.ADDR_LIST)
 
     args = parser.parse_args()
-    src_rom = apu.get_rom(args.src_rom_path)
-    target_rom = apu.get_rom(args.target_rom_path)
+    src_rom = apu.get_rom(args.src_rom_path, True)
+    target_rom = apu.get_rom(args.target_rom_path, True)
     addrs = apu.get_hex_list(args.addr_list)
 
     finder = Finder(src_rom, target_rom)
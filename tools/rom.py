@@ -1,36 +1,104 @@
+import hashlib
+import mmap
+import os
 from typing import Dict
+
+import numpy as np
+
 from constants import *
 
 
 SIZE_8MB = 0x800000
 SIZE_16MB = 0x800000
+SIZE_32MB = 0x2000000
 ROM_OFFSET = 0x80000000
+ROM_END = ROM_OFFSET + SIZE_32MB
 
 
 class Rom(object):
-    def __init__(self, path: str):
-        # read file
-        with open(path, "rb") as f:
-            self.data = f.read()
-        # check length
-        if len(self.data) not in (SIZE_8MB, SIZE_16MB):
-            raise ValueError("ROM should be 8MB or 16MB")
-        # check title and code
-        title = self.read_ascii(0xA0, 0x10)
-        if title == "FIREEMBLEM6\0AFEJ":
-            self.game = GAME_FE6
-            self.region = REGION_J
-        elif title == "FIREEMBLEM8\0BE8J":
-            self.game = GAME_FE8
-            self.region = REGION_J
-        elif title == "FIREEMBLEM2EBE8E":
-            self.game = GAME_FE8
-            self.region = REGION_U
-        elif title == "FIREEMBLEM2PBE8P":
-            self.game = GAME_FE8
-            self.region = REGION_E
+    def __init__(self, path: str, use_mmap: bool = False):
+        self.path = path
+        self.use_mmap = use_mmap
+        self._mmap = None
+        # the view of the map, kept to release it even if data is replaced
+        self._mmap_view = None
+        self._views: Dict[str, np.ndarray] = {}
+        self._views_src = None
+        self._sha1 = None
+        if use_mmap:
+            # map file read-only; processes mapping the same ROM share the
+            # page cache instead of each holding a private copy
+            with open(path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmap_view = memoryview(self._mmap)
+            self.data = self._mmap_view
         else:
-            raise ValueError("Not a valid GBA FE6/FE8 ROM")
+            # read file
+            with open(path, "rb") as f:
+                self.data = f.read()
+        try:
+            # check length
+            if len(self.data) not in (SIZE_8MB, SIZE_16MB):
+                raise ValueError("ROM should be 8MB or 16MB")
+            # check title and code
+            title = self.read_ascii(0xA0, 0x10)
+            if title == "FIREEMBLEM6\0AFEJ":
+                self.game = GAME_FE6
+                self.region = REGION_J
+            elif title == "FIREEMBLEM8\0BE8J":
+                self.game = GAME_FE8
+                self.region = REGION_J
+            elif title == "FIREEMBLEM2EBE8E":
+                self.game = GAME_FE8
+                self.region = REGION_U
+            elif title == "FIREEMBLEM2PBE8P":
+                self.game = GAME_FE8
+                self.region = REGION_E
+            else:
+                raise ValueError("Not a valid GBA FE6/FE8 ROM")
+        except Exception:
+            # don't leave the file mapped when it isn't a usable ROM
+            self.close()
+            raise
+
+    def __enter__(self) -> "Rom":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        # mapped ROMs are reopened by path instead of copying the image
+        state = self.__dict__.copy()
+        state["_views"] = {}
+        state["_views_src"] = None
+        state["_sha1"] = None
+        if self.use_mmap:
+            # data that replaced the mapped view is copied as usual
+            if self.data is self._mmap_view:
+                state["data"] = None
+            state["_mmap"] = None
+            state["_mmap_view"] = None
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        if self.use_mmap:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mmap_view = memoryview(self._mmap)
+            if self.data is None:
+                self.data = self._mmap_view
+
+    def close(self) -> None:
+        # drop array views so the buffer can be released
+        self._views = {}
+        self._views_src = None
+        if self._mmap is not None:
+            self._mmap_view.release()
+            self._mmap_view = None
+            self._mmap.close()
+            self._mmap = None
 
     def read8(self, addr: int) -> int:
         return self.data[addr]
@@ -56,7 +124,64 @@ class Rom(object):
 
     def read_bytes(self, addr: int, size: int) -> bytes:
         end = addr + size
-        return self.data[addr:end]
+        return bytes(self.data[addr:end])
+
+    def sha1(self) -> str:
+        """Returns the SHA-1 hex digest of the ROM image."""
+        if self._sha1 is None or self._sha1[0] is not self.data:
+            self._sha1 = (self.data, hashlib.sha1(self.data).hexdigest())
+        return self._sha1[1]
+
+    def cache_path(self, kind: str, ext: str) -> str:
+        """Returns the path of a cached artifact computed from this ROM."""
+        name = f"{self.game}{self.region.lower()}_{self.sha1()}{ext}"
+        return os.path.join(CACHE_PATH, kind, name)
+
+    def _view(self, dtype: str) -> np.ndarray:
+        # views are rebuilt if the data was replaced (e.g. by region_find)
+        if self._views_src is not self.data:
+            self._views = {}
+            self._views_src = self.data
+        view = self._views.get(dtype)
+        if view is None:
+            view = np.frombuffer(self.data, dtype=dtype)
+            self._views[dtype] = view
+        return view
+
+    def words16(self) -> np.ndarray:
+        """Returns the ROM as little-endian halfwords, indexed by addr // 2."""
+        return self._view("<u2")
+
+    def words32(self) -> np.ndarray:
+        """Returns the ROM as little-endian words, indexed by addr // 4."""
+        return self._view("<u4")
+
+    def words16_range(self, start: int, end: int) -> np.ndarray:
+        """Returns the aligned halfwords in [start, end)."""
+        assert start % 2 == 0 and end % 2 == 0
+        return self.words16()[start // 2:end // 2]
+
+    def words32_range(self, start: int, end: int) -> np.ndarray:
+        """Returns the aligned words in [start, end)."""
+        assert start % 4 == 0 and end % 4 == 0
+        return self.words32()[start // 4:end // 4]
+
+    def ptr_mask(self, start: int, end: int) -> np.ndarray:
+        """
+        Returns a mask of the aligned words in [start, end) that fall within
+        [code_start(True), data_end(True)).
+        """
+        words = self.words32_range(start, end)
+        return (words >= self.code_start(True)) & (words < self.data_end(True))
+
+    def ptr_words(self, start: int, end: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (addrs, vals) of the aligned words in [start, end) that fall
+        within [code_start(True), data_end(True)).
+        """
+        words = self.words32_range(start, end)
+        idxs = np.flatnonzero(self.ptr_mask(start, end))
+        return start + idxs * 4, words[idxs]
 
     def read_ascii(self, addr: int, size: int) -> str:
         return self.read_bytes(addr, size).decode("ascii")
@@ -167,4 +292,13 @@ class Rom(object):
                 }
 
     def find_bytes(self, pat: bytes, start: int = 0) -> int:
+        # only search the map while the data is still its view; memoryviews
+        # have no find, and replaced data has to be searched itself
+        if self._mmap is not None and self.data is self._mmap_view:
+            return self._mmap.find(pat, start)
         return self.data.find(pat, start)
+
+    # aliases used by the analysis tools
+    read_8 = read8
+    read_16 = read16
+    read_32 = read32
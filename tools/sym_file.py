@@ -1,8 +1,8 @@
 import argparse
 
 import argparse_utils as apu
+from code_model import CodeModel
 from constants import MAP_CODE, MAP_DATA, MAP_RAM
-from function import all_functions
 from info.game_info import GameInfo
 from info.info_entry import DataEntry, CodeEntry
 from info.info_file_utils import get_info_file_from_json
@@ -14,7 +14,7 @@ def gen_sym_file(rom: Rom) -> list[str]:
     func_addrs = []
     loaded_words = set()
     pool_sizes = []
-    funcs = all_functions(rom)
+    funcs = CodeModel.for_rom(rom).functions()
     for func in funcs:
         func_addrs.append(func.start_addr)
         func_pools = func.get_data_pools()
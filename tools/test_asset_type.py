@@ -0,0 +1,33 @@
+import unittest
+
+from info.asset_type import ArrayType, PointerType, TypeSpecKind, parse_type
+
+
+class ParseTypeTest(unittest.TestCase):
+    def test_shared(self):
+        before = parse_type.cache_info()
+        a = parse_type("const u16[0x10]")
+        b = parse_type("const u16[0x10]")
+        self.assertIs(a, b)
+        after = parse_type.cache_info()
+        self.assertEqual(after.hits - before.hits, 1)
+        self.assertIsInstance(a, ArrayType)
+        self.assertEqual(a.inner_type.quals[0].name, "CONST")
+
+    def test_immutable_fields(self):
+        t = parse_type("struct Unit *")
+        self.assertIsInstance(t, PointerType)
+        self.assertEqual(t.spec_kind(), TypeSpecKind.STRUCT)
+        self.assertEqual(t.spec_names(), ("Unit",))
+        with self.assertRaises(AttributeError):
+            t.spec_names().append("Other")
+        self.assertEqual(t.decl_str("p"), "struct Unit* p")
+
+    def test_function_pointer(self):
+        t = parse_type("void (*)(int, char*)")
+        self.assertEqual(len(t.inner_type.params), 2)
+        self.assertEqual(t.decl_str(), "void (*)(int, char*)")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import unittest
+
+from code_model import CodeModel, map_functions
+from function import Function, FuncDiff, all_functions, compare
+from rom import Rom
+from test_rom import make_rom_file
+
+
+# push {lr}; ldr r0,[pc,#8]; bl .; pop {pc}; .2byte 0; .word 0x08000001
+FUNC = [0xB500, 0x4802, 0xF7FF, 0xFFFE, 0xBD00, 0x0000, 0x0001, 0x0800]
+
+
+def func_bounds(func: Function) -> tuple[int, int]:
+    return func.start_addr, func.end_addr
+
+
+class CodeModelTest(unittest.TestCase):
+    def setUp(self):
+        path = make_rom_file()
+        self.addCleanup(os.remove, path)
+        self.rom = Rom(path)
+        start = self.rom.code_start()
+        data = bytearray(self.rom.data)
+        halfs = FUNC * 4
+        for i, h in enumerate(halfs):
+            data[start + i * 2:start + i * 2 + 2] = h.to_bytes(2, "little")
+        with open(path, "wb") as f:
+            f.write(data)
+        self.rom = Rom(path)
+        end = start + len(halfs) * 2
+        self.rom.code_end = lambda virt=False: end
+        self.rom.arm_functions = lambda: {}
+
+    def test_matches_all_functions(self):
+        model = CodeModel.build(self.rom)
+        funcs = list(all_functions(self.rom))
+        self.assertEqual(len(model), len(funcs))
+        for info, func in zip(model.functions(), funcs):
+            self.assertEqual(info.start_addr, func.start_addr)
+            self.assertEqual(info.end_addr, func.end_addr)
+            self.assertEqual(info.data_pool, func.data_pool)
+            self.assertEqual(info.get_data_pools(), func.get_data_pools())
+            self.assertEqual(
+                [str(i) for i in info.get_instructions()],
+                [str(i) for i in func.get_instructions()]
+            )
+            self.assertEqual(len(info.bls), 1)
+            self.assertEqual(info.bls, func.get_bls())
+            self.assertEqual(compare(info, func), FuncDiff.SAME_WITH_BL)
+
+    def test_save_and_load(self):
+        model = CodeModel.build(self.rom)
+        path = self.rom.path + ".npz"
+        self.addCleanup(os.remove, path)
+        model.save(path)
+        loaded = CodeModel.load(self.rom, path)
+        self.assertEqual(loaded.starts.tolist(), model.starts.tolist())
+        self.assertEqual(loaded.func_at(model[1].start_addr).bls, model[1].bls)
+        self.assertIsNone(loaded.func_at(model[1].start_addr + 2))
+
+    def test_map_functions(self):
+        model = CodeModel.build(self.rom)
+        path = self.rom.cache_path("code", ".npz")
+        self.addCleanup(os.remove, path)
+        model.save(path)
+        expected = [(f.start_addr, f.end_addr) for f in model.functions()]
+        self.assertEqual(map_functions(self.rom, func_bounds, 1), expected)
+        self.assertEqual(map_functions(self.rom, func_bounds, 2, 1), expected)
+
+    def test_map_functions_modified_rom(self):
+        data = bytearray(self.rom.data)
+        data[0] ^= 0xFF
+        self.rom.data = bytes(data)
+        self.addCleanup(os.remove, self.rom.cache_path("code", ".npz"))
+        starts = [f.start_addr for f in all_functions(self.rom)]
+        self.assertEqual([b[0] for b in map_functions(self.rom, func_bounds, 1)], starts)
+        with self.assertRaises(ValueError):
+            map_functions(self.rom, func_bounds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,169 @@
+import os
+import random
+import tempfile
+import unittest
+
+from compress import (
+    LzCompMethod, MAX_MATCH_SIZE, _find_best_path, _find_best_path_heap, _find_longest_matches,
+    benchmark, comp_lz77, comp_lz77_many, decomp_lz77, decomp_rle, decompress_any, iter_decomp_lz77
+)
+
+
+def sample_data() -> list[bytes]:
+    rng = random.Random(7)
+    tile = rng.randbytes(32)
+    tiles = bytearray()
+    for _ in range(64):
+        noisy = bytearray(tile)
+        noisy[rng.randrange(32)] = rng.randrange(256)
+        tiles += noisy
+    return [
+        b"abc",
+        bytes(100),
+        b"ab" * 300,
+        rng.randbytes(500),
+        bytes(rng.choice(b"xy") for _ in range(2000)),
+        bytes(tiles),
+    ]
+
+
+class LongestMatchesTest(unittest.TestCase):
+    def test_short_input(self):
+        self.assertEqual(_find_longest_matches(b"ab", False), {})
+
+    def test_min_distance(self):
+        for matching, min_dist in ((False, 2), (True, 4)):
+            for data in sample_data():
+                matches = _find_longest_matches(data, matching)
+                for i, (idx, size) in matches.items():
+                    self.assertLessEqual(idx, i - min_dist)
+                    self.assertLessEqual(size, MAX_MATCH_SIZE)
+                    self.assertEqual(data[idx:idx + size], data[i:i + size])
+
+    def test_runs(self):
+        matches = _find_longest_matches(bytes(40), False)
+        self.assertEqual(matches[2], (0, MAX_MATCH_SIZE))
+        self.assertEqual(matches[30], (28, 10))
+        self.assertEqual(_find_longest_matches(bytes(40), True)[4], (0, MAX_MATCH_SIZE))
+
+
+class CompLz77Test(unittest.TestCase):
+    def test_round_trip(self):
+        for method in LzCompMethod:
+            for data in sample_data():
+                comp = comp_lz77(data, method)
+                self.assertEqual(decomp_lz77(comp, 0), (data, len(comp)))
+
+    def test_optimal_not_larger(self):
+        for data in sample_data():
+            greedy = comp_lz77(data, LzCompMethod.GREEDY)
+            optimal = comp_lz77(data, LzCompMethod.OPTIMAL)
+            self.assertLessEqual(len(optimal), len(greedy))
+
+    def test_best_path_ties(self):
+        # Both 3+3 and 1+1+... reach 6, the cheaper pair of matches wins
+        matches = {0: (0, 3), 3: (0, 3)}
+        self.assertEqual(_find_best_path(6, matches), [6, 3, 0])
+        self.assertEqual(_find_best_path_heap(6, matches), [6, 3, 0])
+
+    def test_best_path_matches_heap(self):
+        for data in sample_data():
+            matches = _find_longest_matches(data, False)
+            self.assertEqual(
+                _find_best_path(len(data), matches),
+                _find_best_path_heap(len(data), matches)
+            )
+
+    def test_benchmark(self):
+        results = benchmark(bytes(200))
+        self.assertEqual(set(results), {m.name for m in LzCompMethod} | {"OPTIMAL_HEAP"})
+        self.assertEqual(results["OPTIMAL_HEAP"][0], results["OPTIMAL"][0])
+        for size, elapsed, peak in results.values():
+            self.assertGreater(size, 0)
+            self.assertGreaterEqual(elapsed, 0)
+            self.assertGreater(peak, 0)
+
+
+class DecompLz77Test(unittest.TestCase):
+    def test_overlapping_copy(self):
+        # "ab", then copy 7 bytes from 2 back
+        comp = bytes([0x10, 9, 0, 0, 0x20, ord("a"), ord("b"), 0x40, 0x01])
+        self.assertEqual(decomp_lz77(comp, 0), (b"ababababa", len(comp)))
+
+    def test_bad_window(self):
+        comp = bytes([0x10, 5, 0, 0, 0x80, 0x00, 0x00])
+        with self.assertRaises(ValueError):
+            decomp_lz77(comp, 0)
+
+    def test_streaming(self):
+        for data in sample_data():
+            comp = b"\xFF" + comp_lz77(data)
+            chunks = iter_decomp_lz77(comp, 1, 64)
+            parts = []
+            try:
+                while True:
+                    parts.append(next(chunks))
+            except StopIteration as stop:
+                self.assertEqual(stop.value, len(comp) - 1)
+            self.assertEqual(b"".join(parts), data)
+
+
+class FakeRom:
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+# Pass 1: 3 literals, run of 2; pass 2 (16-bit counts): run of 5
+RLE_DATA = bytes([1, 3, 1, 2, 3, 0x82, 9, 0, 2, 0x80, 0x05, 7, 0, 0])
+
+
+class DecompRleTest(unittest.TestCase):
+    def test_interleave(self):
+        raw, size = decomp_rle(b"\xFF" + RLE_DATA, 1)
+        self.assertEqual(raw, bytes([1, 7, 2, 7, 3, 7, 9, 7, 9, 7]))
+        self.assertEqual(size, len(RLE_DATA))
+
+    def test_uneven_passes(self):
+        with self.assertRaises(ValueError):
+            decomp_rle(bytes([1, 1, 5, 0, 1, 0]), 0)
+
+    def test_decompress_any(self):
+        comp = comp_lz77(bytes(100))
+        rom = FakeRom(RLE_DATA + comp)
+        self.assertEqual(decompress_any(rom, 0), decomp_rle(RLE_DATA, 0))
+        self.assertEqual(decompress_any(rom, len(RLE_DATA)), (bytes(100), len(comp)))
+        with self.assertRaises(ValueError):
+            decompress_any(rom, 2)
+
+
+class CompLz77ManyTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+
+    def test_matches_single(self):
+        data = sample_data()
+        expected = [comp_lz77(buffer, LzCompMethod.MATCHING) for buffer in data]
+        for processes in (1, 2):
+            outputs = comp_lz77_many(data, LzCompMethod.MATCHING, processes, None, True)
+            self.assertEqual(outputs, expected)
+
+    def test_cache(self):
+        data = sample_data()
+        outputs = comp_lz77_many(data + data[:1], cache_dir=self.cache_dir)
+        self.assertEqual(outputs[-1], outputs[0])
+        self.assertEqual(len(os.listdir(self.cache_dir)), len(data))
+
+        # Cached outputs are returned as is, unless they fail verification
+        name = min(os.listdir(self.cache_dir))
+        with open(os.path.join(self.cache_dir, name), "wb") as f:
+            f.write(b"bad")
+        cached = comp_lz77_many(data, cache_dir=self.cache_dir)
+        self.assertIn(b"bad", cached)
+        verified = comp_lz77_many(data, cache_dir=self.cache_dir, verify=True)
+        self.assertEqual(verified, outputs[:-1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import pickle
+import unittest
+from unittest import mock
+
+from constants import MAP_CODE, MAP_DATA, MAP_STRUCTS
+from info.game_info import GameInfo
+from info.info_entry import CodeEntry, CodeMode, DataEntry, StructVarEntry
+
+
+def make_info() -> GameInfo:
+    info = GameInfo(None)
+    info.ram = [DataEntry("gBuf", None, "char", 0x100, 0x2000000, None)]
+    info.code = [
+        CodeEntry("Start", None, 0x100, 0x20, CodeMode.Thumb, None, None, None),
+        CodeEntry("Main", None, 0x120, 0x40, CodeMode.Thumb, None, None, None),
+    ]
+    info.data = [
+        DataEntry("gTable", None, "int", 8, 0x1000, None),
+        DataEntry("gInner", None, "char", 4, 0x1008, None),
+        DataEntry("gNext", None, "short", None, 0x1020, None),
+    ]
+    info.sizes = {}
+    info.types = {}
+    return info
+
+
+class GameInfoIndexTest(unittest.TestCase):
+    def test_names(self):
+        info = make_info()
+        self.assertIs(info.get_code("Main"), info.code[1])
+        self.assertIs(info.get_entry("gBuf"), info.ram[0])
+        self.assertIsNone(info.get_data("Main"))
+
+    def test_addrs(self):
+        info = make_info()
+        self.assertIs(info.get_entry_by_addr(0x1008), info.data[1])
+        self.assertIsNone(info.get_entry_by_addr(0x1004))
+        self.assertIs(info.get_prev_entry(MAP_CODE, 0x15F), info.code[1])
+        self.assertIsNone(info.get_prev_entry(MAP_DATA, 0xFFF))
+        self.assertEqual(info.get_prev_index(MAP_DATA, 0x1020), 2)
+
+    def test_containing(self):
+        info = make_info()
+        self.assertIs(info.get_entry_containing(0x1009), info.data[1])
+        # Past gInner but still inside gTable
+        self.assertIs(info.get_entry_containing(0x100C), info.data[0])
+        self.assertIsNone(info.get_entry_containing(0x1020 + 2))
+        self.assertIs(info.get_entry_containing(0x20000FF), info.ram[0])
+
+
+class InfoEntryTest(unittest.TestCase):
+    def test_compact(self):
+        a = StructVarEntry("unk" + "0", None, "struct Unit *", None, 0)
+        b = StructVarEntry("unk" + "0", None, "struct Unit *", None, 4)
+        self.assertFalse(hasattr(a, "__dict__"))
+        self.assertIs(a.type, b.type)
+        self.assertIs(a.name, b.name)
+
+    def test_pickle(self):
+        info = make_info()
+        entries = pickle.loads(pickle.dumps(info.data, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual([e.name for e in entries], [e.name for e in info.data])
+        self.assertEqual(entries[0].type_str(), "int")
+        self.assertEqual(entries[2].addr, 0x1020)
+
+
+class GameInfoLoadTest(unittest.TestCase):
+    def test_lazy_maps(self):
+        code = make_info().code
+        with mock.patch("info.game_info.get_info_file_from_json", return_value=code) as load:
+            info = GameInfo("fe8", "U")
+            load.assert_not_called()
+            self.assertIs(info.get_code("Main"), code[1])
+            self.assertIs(info.code, code)
+            load.assert_called_once_with("fe8", MAP_CODE, "U", True)
+            load.return_value = []
+            self.assertEqual(info.structs, {})
+            self.assertEqual(load.call_args_list[1][0][1], MAP_STRUCTS)
+
+
+class RealGameInfoTest(unittest.TestCase):
+    def test_fe8_sizes(self):
+        info = GameInfo("fe8", "U", use_cache=False)
+        # No unions, typedefs or data are extracted for fe8
+        self.assertEqual(info.unions, {})
+        self.assertEqual(info.typedefs, {})
+        self.assertEqual(info.data, [])
+        self.assertEqual(len(info.sizes), len(info.structs))
+        self.assertEqual(info.sizes["MinimapProc"], 0x50)
+        self.assertIs(info.get_entry_containing(0x8000240), info.get_code("ColorFadeTick"))
+
+
+if __name__ == "__main__":
+    unittest.main()
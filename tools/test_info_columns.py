@@ -0,0 +1,111 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from constants import MAP_CODE, MAP_DATA
+from info.game_info import GameInfo, InfoSource
+from info.info_columns import InfoColumns, read_info_columns, write_info_columns
+from info.info_entry import CodeEntry, NamedVarEntry
+from info.info_file_utils import (
+    find_columns_file, get_info_file_from_columns,
+    get_info_file_from_json, parse_info_columns
+)
+
+
+OBJS = [
+    {"desc": "Start", "label": "Start", "addr": "8000000", "size": "10", "params": None},
+    {"desc": "Start", "label": "Main", "addr": {"J": "8000010", "U": "8000020"},
+        "size": "?", "params": [{"desc": "x", "type": "int"}]},
+    {"desc": "Next", "label": "Next", "addr": "08000030", "params": [{"desc": "x", "type": "int"}]},
+    {"label": "Last", "count": 3},
+]
+
+
+class InfoColumnsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "code.npz")
+        write_info_columns(self.path, OBJS)
+
+    def test_round_trip(self):
+        objs = read_info_columns(self.path)
+        self.assertEqual(objs, OBJS)
+        # Repeated lists aren't shared between entries
+        self.assertIsNot(objs[1]["params"], objs[2]["params"])
+
+    def test_columns(self):
+        columns = InfoColumns.load(self.path)
+        self.assertEqual(len(columns), 4)
+        addrs, present = columns.region_ints("addr", "U")
+        self.assertEqual(addrs.dtype, np.uint32)
+        self.assertEqual(addrs[present].tolist(), [0x8000000, 0x8000020])
+        # Wouldn't be written back the same way, so it's kept as a string
+        self.assertEqual(columns.strings[columns.codes("addr")[2]], "08000030")
+        labels = [columns.strings[c] for c in columns.codes("label").tolist()]
+        self.assertEqual(labels, ["Start", "Main", "Next", "Last"])
+        self.assertEqual(columns.strings.count("Start"), 1)
+
+    def test_child_rows(self):
+        columns = InfoColumns.load(self.path)
+        params = columns.child("params")
+        self.assertEqual(len(params), 2)
+        self.assertEqual(params.column("type"), ["int", "int"])
+        self.assertEqual(columns.column("addr"), [
+            0x8000000, {"J": 0x8000010, "U": 0x8000020}, "08000030", None
+        ])
+        descs = columns.column("params", lambda c: c.column("desc"))
+        self.assertEqual(descs, [None, ["x"], ["x"], None])
+
+    def test_parse_info_columns(self):
+        objs = [
+            {"label": "Start", "addr": "8000000", "size": "10", "mode": "thumb",
+                "params": None, "return": None, "line": "a.c:1"},
+            {"label": "Main", "addr": {"J": "8000010", "U": "8000020"}, "size": "8",
+                "mode": "arm", "params": [{"type": "int", "count": "2"}],
+                "return": {"type": "int"}, "line": "a.c:5"},
+            {"label": "OnlyJ", "addr": {"J": "8000030"}, "size": "4", "mode": "thumb",
+                "params": [], "return": None, "line": "a.c:9"},
+        ]
+        write_info_columns(self.path, objs)
+        entries = parse_info_columns(InfoColumns.load(self.path), MAP_CODE, "U")
+        self.assertEqual([e.name for e in entries], ["Start", "Main"])
+        self.assertEqual(entries[1].addr, 0x8000020)
+        self.assertIsNone(entries[0].params)
+        self.assertIsInstance(entries[1].params[0], NamedVarEntry)
+        self.assertEqual(entries[1].params[0].arr_count, 2)
+        expected = CodeEntry.from_obj(objs[1])
+        expected.to_region("U")
+        self.assertEqual(entries[1].mode, expected.mode)
+        self.assertEqual(entries[1].ret.type_str(), expected.ret.type_str())
+
+    @unittest.skipUnless(
+        os.path.isfile(find_columns_file("fe6", MAP_DATA)), "No columnar export"
+    )
+    def test_faster_than_json(self):
+        # Best of several runs, so a busy machine doesn't fail the check
+        def best(load) -> float:
+            times = []
+            for _ in range(5):
+                start = time.perf_counter()
+                load()
+                times.append(time.perf_counter() - start)
+            return min(times)
+        for game, map_type in (("fe6", MAP_DATA), ("fe8", MAP_CODE)):
+            json_time = best(lambda: get_info_file_from_json(game, map_type, use_cache=False))
+            columns_time = best(lambda: get_info_file_from_columns(game, map_type, use_cache=False))
+            self.assertLess(columns_time, json_time, (game, map_type))
+
+    def test_game_info_source(self):
+        with mock.patch("info.game_info.get_info_file_from_columns", return_value=[]) as load:
+            info = GameInfo("fe8", "U", InfoSource.COLUMNS)
+            self.assertEqual(info.code, [])
+            load.assert_called_once_with("fe8", MAP_CODE, "U", True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from constants import *
+from info import info_file_utils
+from info.info_entry import CodeEntry
+from info.info_file_utils import (
+    find_json_file, iter_info_file_from_json, iter_json_array, load_cached_info_file
+)
+
+
+class InfoCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(info_file_utils, "INFO_CACHE_PATH", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.source = os.path.join(tmp.name, "code.json")
+        with open(self.source, "w") as f:
+            f.write("[]")
+        self.builds = 0
+
+    def build(self) -> list:
+        self.builds += 1
+        return [self.builds]
+
+    def test_reuses_until_source_changes(self):
+        self.assertEqual(load_cached_info_file("code", [self.source], self.build), [1])
+        self.assertEqual(load_cached_info_file("code", [self.source], self.build), [1])
+        with open(self.source, "w") as f:
+            f.write("[ ]")
+        self.assertEqual(load_cached_info_file("code", [self.source], self.build), [2])
+        self.assertEqual(self.builds, 2)
+
+    def test_corrupt_cache(self):
+        load_cached_info_file("code", [self.source], self.build)
+        path = os.path.join(info_file_utils.INFO_CACHE_PATH, "code.pickle")
+        with open(path, "wb") as f:
+            f.write(b"bad")
+        self.assertEqual(load_cached_info_file("code", [self.source], self.build), [2])
+
+
+class JsonArrayTest(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def read(self, text: str, chunk_size: int) -> list:
+        with open(self.path, "w") as f:
+            f.write(text)
+        return list(iter_json_array(self.path, chunk_size))
+
+    def test_elements(self):
+        text = ' [ {"addr": "0x10", "vars": [1, 2]} ,\n2.5, "x]", -3e2, null ]\n'
+        for chunk_size in (1, 2, 5, 0x10000):
+            self.assertEqual(self.read(text, chunk_size), json.loads(text))
+        self.assertEqual(self.read("[]", 1), [])
+
+    def test_invalid(self):
+        for text in ("[1,", "{}", "[{]"):
+            with self.assertRaises(ValueError):
+                self.read(text, 2)
+
+
+class RealJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.path = find_json_file(GAME_FE8, MAP_CODE)
+
+    def test_streams_like_json_load(self):
+        with open(self.path) as f:
+            expected = json.load(f)
+        self.assertEqual(list(iter_json_array(self.path, 0x1000)), expected)
+
+    def test_parses_entries(self):
+        entries = list(iter_info_file_from_json(GAME_FE8, MAP_CODE, REGION_U))
+        self.assertTrue(entries)
+        entry = next(e for e in entries if e.name == "ColorFadeTick")
+        self.assertIsInstance(entry, CodeEntry)
+        self.assertEqual(entry.addr, 0x8000234)
+        self.assertEqual(entry.size, 0xD0)
+        self.assertTrue(entry.is_thumb())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+
+from constants import GAME_FE8, REGION_U
+from info.game_info import InfoSource
+from info_memory import INFO_MAPS, measure_game
+
+
+class MeasureGameTest(unittest.TestCase):
+    def test_fe8_json(self):
+        results = measure_game(GAME_FE8, REGION_U, InfoSource.JSON)
+        self.assertEqual(tuple(results), INFO_MAPS)
+        # Loads json/fe8/code.json, and fe8 has no data, unions or typedefs
+        self.assertGreater(results["code"], 0)
+        self.assertGreater(results["structs"], 0)
+        self.assertEqual(results["data"], 0)
+        self.assertEqual(results["unions"], 0)
+        self.assertEqual(results["typedefs"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import unittest
+from unittest import mock
+
+from compress import comp_lz77
+from lz_finder import LzTable
+from rom import Rom
+from test_rom import make_rom_file
+
+
+class LzTableTest(unittest.TestCase):
+    def setUp(self):
+        path = make_rom_file()
+        self.addCleanup(os.remove, path)
+        rom = Rom(path)
+        data = bytearray(rom.data)
+        start = rom.data_start()
+        self.comp = comp_lz77(bytes(range(64)) * 4)
+        self.addrs = [start + 0x100, start + 0x400]
+        for addr in self.addrs:
+            data[addr:addr + len(self.comp)] = self.comp
+        # Header with a back-reference first
+        data[start + 0x800:start + 0x808] = bytes([0x10, 8, 0, 0, 0x80, 0, 0, 0])
+        with open(path, "wb") as f:
+            f.write(data)
+        self.rom = Rom(path)
+
+    def test_build(self):
+        expected = [(addr, len(self.comp), 0x100) for addr in self.addrs]
+        for processes in (1, 2):
+            table = LzTable.build(self.rom, processes)
+            self.assertEqual(table.streams(), expected)
+        self.assertEqual(table.stream_at(self.addrs[1]), (len(self.comp), 0x100))
+        self.assertIsNone(table.stream_at(self.addrs[1] + 4))
+        self.assertEqual(table.stream_containing(self.addrs[1] + 4), expected[1])
+        self.assertIsNone(table.stream_containing(self.addrs[1] + len(self.comp)))
+
+    def test_build_patched(self):
+        # Workers would read the file, which doesn't have the new stream
+        data = bytearray(self.rom.data)
+        addr = self.rom.data_start() + 0x1000
+        data[addr:addr + len(self.comp)] = self.comp
+        self.rom.data = bytes(data)
+        with mock.patch("lz_finder.ProcessPoolExecutor") as executor:
+            table = LzTable.build(self.rom, 2)
+            executor.assert_not_called()
+        self.assertEqual(table.stream_at(addr), (len(self.comp), 0x100))
+
+    def test_save_and_load(self):
+        table = LzTable.build(self.rom, 1)
+        path = self.rom.path + ".npz"
+        self.addCleanup(os.remove, path)
+        table.save(path)
+        self.assertEqual(LzTable.load(path).streams(), table.streams())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import unittest
+
+from ref_index import RefIndex
+from rom import Rom
+from test_rom import make_rom_file
+
+
+class RefIndexTest(unittest.TestCase):
+    def setUp(self):
+        path = make_rom_file()
+        self.addCleanup(os.remove, path)
+        self.rom = Rom(path)
+        data = bytearray(self.rom.data)
+        start = self.rom.code_start()
+        # ldr r0,[pc,#4] twice, loading the same pool word
+        data[start:start + 2] = (0x4801).to_bytes(2, "little")
+        data[start + 2:start + 4] = (0x4901).to_bytes(2, "little")
+        data[start + 8:start + 12] = (0x08001235).to_bytes(4, "little")
+        # bl start+0x30
+        data[start + 12:start + 14] = (0xF000).to_bytes(2, "little")
+        data[start + 14:start + 16] = (0xF810).to_bytes(2, "little")
+        # data word with the same value
+        data_start = self.rom.data_start()
+        data[data_start + 8:data_start + 12] = (0x08001235).to_bytes(4, "little")
+        self.rom.data = bytes(data)
+        self.start = start
+        self.data_start = data_start
+
+    def test_lookups(self):
+        index = RefIndex.build(self.rom)
+        self.assertEqual(index.pool_sites(0x08001235), {
+            self.start + 8: [self.start, self.start + 2]
+        })
+        self.assertEqual(index.bl_sites(self.start + 0x30), [self.start + 12])
+        self.assertEqual(index.data_sites(0x08001235), [self.data_start + 8])
+        self.assertEqual(index.data_sites(1 << 40), [])
+
+    def test_save_and_load(self):
+        index = RefIndex.build(self.rom)
+        path = os.path.join(os.path.dirname(self.rom.path), "test_ref_index.npz")
+        self.addCleanup(os.remove, path)
+        index.save(path)
+        loaded = RefIndex.load(path)
+        self.assertEqual(loaded.bl_sites(self.start + 0x30), [self.start + 12])
+        self.assertEqual(loaded.data_sites(0x08001235), [self.data_start + 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import mmap
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+from rom import Rom, SIZE_8MB
+
+
+def make_rom_file(title: bytes = b"FIREEMBLEM2EBE8E") -> str:
+    data = bytearray(SIZE_8MB)
+    data[0xA0:0xB0] = title
+    data[0x100:0x108] = bytes([0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08])
+    fd, path = tempfile.mkstemp(suffix=".gba")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+class RomTest(unittest.TestCase):
+    def setUp(self):
+        self.path = make_rom_file()
+        self.addCleanup(os.remove, self.path)
+
+    def test_mmap_matches_read(self):
+        rom = Rom(self.path)
+        with Rom(self.path, use_mmap=True) as mrom:
+            self.assertEqual(mrom.game, rom.game)
+            self.assertEqual(mrom.region, rom.region)
+            self.assertEqual(mrom.read8(0x101), rom.read8(0x101))
+            self.assertEqual(mrom.read16(0x100), rom.read16(0x100))
+            self.assertEqual(mrom.read32(0x104), rom.read32(0x104))
+            self.assertEqual(mrom.read_ptr(0x100), rom.read_ptr(0x100))
+            self.assertEqual(mrom.read_bytes(0x100, 8), rom.read_bytes(0x100, 8))
+            self.assertIsInstance(mrom.read_bytes(0x100, 8), bytes)
+            self.assertEqual(mrom.find_bytes(b"\x05\x06"), 0x104)
+
+    def test_find_bytes_replaced_data(self):
+        with Rom(self.path, use_mmap=True) as rom:
+            data = bytearray(rom.data)
+            data[0x100:0x102] = b"\xAA\xBB"
+            rom.data = data
+            self.assertEqual(rom.find_bytes(b"\xAA\xBB"), 0x100)
+            self.assertEqual(rom.find_bytes(b"\x01\x02"), -1)
+            with pickle.loads(pickle.dumps(rom)) as copy:
+                self.assertEqual(copy.find_bytes(b"\xAA\xBB"), 0x100)
+
+    def test_invalid_mmap_closed(self):
+        path = make_rom_file(b"NOT A FE ROM\0\0\0\0")
+        self.addCleanup(os.remove, path)
+        maps = []
+        real_mmap = mmap.mmap
+
+        def map_file(*args, **kwargs):
+            maps.append(real_mmap(*args, **kwargs))
+            return maps[-1]
+        with mock.patch("rom.mmap.mmap", side_effect=map_file):
+            with self.assertRaises(ValueError):
+                Rom(path, use_mmap=True)
+        self.assertEqual(len(maps), 1)
+        self.assertTrue(maps[0].closed)
+
+    def test_word_views(self):
+        with Rom(self.path, use_mmap=True) as rom:
+            self.assertEqual(rom.words16()[0x100 // 2], rom.read16(0x100))
+            self.assertEqual(rom.words32()[0x104 // 4], rom.read32(0x104))
+            self.assertEqual(list(rom.words32_range(0x100, 0x108)), [0x04030201, 0x08070605])
+
+    def test_ptr_words(self):
+        rom = Rom(self.path)
+        data = bytearray(rom.data)
+        ptr = rom.data_start(True)
+        data[0x200:0x204] = ptr.to_bytes(4, "little")
+        data[0x208:0x20C] = rom.data_end(True).to_bytes(4, "little")
+        rom.data = bytes(data)
+        addrs, vals = rom.ptr_words(0x200, 0x210)
+        self.assertEqual(addrs.tolist(), [0x200])
+        self.assertEqual(vals.tolist(), [ptr])
+
+    def test_mmap_pickles_by_path(self):
+        with Rom(self.path, use_mmap=True) as rom:
+            state = pickle.dumps(rom)
+            self.assertLess(len(state), 1024)
+        with pickle.loads(state) as copy:
+            self.assertEqual(copy.read32(0x100), 0x04030201)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+
+from constants import GAME_FE6, REGION_U
+from find_ptrs import find_prim_at_offset
+from info.game_info import GameInfo
+from info.asset_type import parse_type
+from info.info_entry import DataEntry, NamedVarEntry, StructEntry, StructVarEntry, UnionEntry
+from info.struct_layout import StructLayouts
+from info.type_resolver import TypeResolver
+from test_game_info import make_info
+
+
+def make_layouts() -> StructLayouts:
+    pos = StructEntry("Pos", None, 4, [
+        StructVarEntry("x", None, "short", None, 0),
+        StructVarEntry("y", None, "short", None, 2),
+    ], None)
+    unit = StructEntry("Unit", None, 0x14, [
+        StructVarEntry("name", None, "char *", None, 0),
+        StructVarEntry("hp", None, "Hp", None, 4),
+        # 1 byte of padding
+        StructVarEntry("path", None, "struct Pos", 2, 8),
+        StructVarEntry("val", None, "union Val", None, 0x10),
+    ], None)
+    val = UnionEntry("Val", None, 4, [
+        NamedVarEntry("bytes", None, "char", 4),
+        NamedVarEntry("ptr", None, "int *", None),
+    ], None)
+    structs = {"Pos": pos, "Unit": unit}
+    unions = {"Val": val}
+    sizes = {"Pos": 4, "Unit": 0x14, "Val": 4}
+    typedefs = {"Hp": parse_type("char")}
+    return StructLayouts(structs, unions, TypeResolver(sizes, typedefs))
+
+
+class StructLayoutTest(unittest.TestCase):
+    def test_struct(self):
+        layouts = make_layouts()
+        layout = layouts.struct_layout("Unit")
+        self.assertEqual(len(layout), 0x14)
+        self.assertIs(layout.at(0), layout.at(3))
+        self.assertTrue(layout.at(2).is_ptr)
+        self.assertEqual(layout.at(4).path, ("hp",))
+        self.assertIsNone(layout.at(5))
+        slot = layout.at(0xF)
+        self.assertEqual(slot.path, ("path[1]", "y"))
+        self.assertEqual((slot.var.name, slot.num, slot.offset), ("y", 0, 0xE))
+        # The first union member covers every byte
+        self.assertEqual(layout.at(0x12).num, 2)
+        self.assertEqual(layout.ptr_offsets(), [0])
+        self.assertIs(layouts.struct_layout("Unit"), layout)
+
+    def test_type(self):
+        layouts = make_layouts()
+        layout = layouts.type_layout(parse_type("struct Pos[3]"))
+        self.assertEqual(len(layout), 12)
+        self.assertEqual(layout.at(10).path, ("[2]", "y"))
+        layout = layouts.type_layout(parse_type("Hp"))
+        self.assertIsNone(layout.at(0).var)
+
+    def test_find_prim(self):
+        info = make_info()
+        info.data = [
+            DataEntry("gUnits", None, "struct Unit", 2, 0x1000, None),
+            DataEntry("gTable", None, "int", 4, 0x1028, None),
+        ]
+        info.layouts = make_layouts()
+        info.resolver = info.layouts.resolver
+        idx, entry, num, off = find_prim_at_offset(info.data, 0, 0x1014 + 0xA, info)
+        self.assertEqual((idx, entry.name, num, off), (0, "y", 0, 0))
+        self.assertEqual(find_prim_at_offset(info.data, 0, 0x1005, info)[1], None)
+        idx, entry, num, off = find_prim_at_offset(info.data, 0, 0x1035, info)
+        self.assertEqual((idx, entry.name, num, off), (1, "gTable", 3, 1))
+        self.assertIsNone(find_prim_at_offset(info.data, 0, 0x1038, info)[1])
+
+    def test_find_prim_opaque(self):
+        info = make_info()
+        info.data = [
+            # Untyped, with only the extracted size
+            DataEntry("gRaw", None, None, None, 0x1000, None, size=8),
+            # A typedef that hasn't been extracted
+            DataEntry("gLut", None, "u8", 4, 0x1008, None, size=4),
+        ]
+        info.layouts = make_layouts()
+        info.resolver = info.layouts.resolver
+        idx, entry, num, off = find_prim_at_offset(info.data, 0, 0x1006, info)
+        self.assertEqual((idx, entry.name, num, off), (0, "gRaw", 0, 6))
+        idx, entry, num, off = find_prim_at_offset(info.data, 0, 0x100A, info)
+        self.assertEqual((idx, entry.name, num, off), (1, "gLut", 0, 2))
+        self.assertFalse(entry.is_ptr(info.types))
+        self.assertIsNone(find_prim_at_offset(info.data, 0, 0x100C, info)[1])
+
+    def test_find_prim_real_data(self):
+        info = GameInfo(GAME_FE6, REGION_U)
+        # Entries that don't share their address with the next one
+        data = [e for e, n in zip(info.data, info.data[1:]) if e.addr < n.addr]
+        untyped = next(e for e in data if e.type is None)
+        typedef = next(e for e in data if e.type_str() == "u8")
+        for entry in (untyped, typedef):
+            idx, prim, num, off = find_prim_at_offset(info.data, 0, entry.addr, info)
+            self.assertIs(info.data[idx], entry)
+            self.assertIs(prim, entry)
+            self.assertEqual((num, off), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+
+from thumb import ThumbForm, ThumbInstruct, ThumbOp, decode
+
+
+class FakeRom:
+    def __init__(self, halfwords: list[int]):
+        self.halfwords = halfwords
+
+    def read_16(self, addr: int) -> int:
+        return self.halfwords[addr // 2]
+
+
+class ThumbDecodeTest(unittest.TestCase):
+    def test_decode_is_shared(self):
+        self.assertIs(decode(0xB500), decode(0xB500))
+
+    def test_push(self):
+        inst = ThumbInstruct(FakeRom([0xB530]), 0)
+        self.assertEqual(inst.opname, ThumbOp.PUSH)
+        self.assertEqual(inst.rlist, [4, 5, 14])
+
+    def test_bl_combines_halfwords_per_site(self):
+        rom = FakeRom([0xF000, 0xF810, 0xF000, 0xF820])
+        first = ThumbInstruct(rom, 0)
+        second = ThumbInstruct(rom, 4)
+        self.assertEqual(first.format, ThumbForm.Link)
+        self.assertEqual(first.branch_addr(), 0x24)
+        self.assertEqual(second.branch_addr(), 0x48)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from info.asset_type import parse_type
+from info.type_resolver import TypeResolver
+
+
+class TypeResolverTest(unittest.TestCase):
+    def make_resolver(self, typedefs: dict[str, str]) -> TypeResolver:
+        return TypeResolver({}, {name: parse_type(t) for name, t in typedefs.items()})
+
+    def test_typedef_chain(self):
+        resolver = self.make_resolver({"s16": "short", "Hp": "s16"})
+        resolver.resolve_all()
+        self.assertEqual(resolver.size_of(parse_type("Hp")), 2)
+        self.assertEqual(resolver.alignment_of(parse_type("Hp")), 2)
+        self.assertEqual(resolver.size_of(parse_type("Hp[3]")), 6)
+        self.assertEqual(resolver.alignment_of(parse_type("Hp[3]")), 2)
+
+    def test_cached(self):
+        resolver = self.make_resolver({"s16": "short"})
+        t = parse_type("s16[4]")
+        self.assertEqual(resolver.size_of(t), 8)
+        # Changing the typedefs doesn't affect answers already given
+        resolver.typedefs["s16"] = parse_type("int")
+        self.assertEqual(resolver.size_of(t), 8)
+
+    def test_invalid(self):
+        resolver = self.make_resolver({"A": "B", "B": "A"})
+        resolver.resolve_all()
+        with self.assertRaises(ValueError):
+            resolver.size_of(parse_type("A"))
+        with self.assertRaises(ValueError):
+            resolver.size_of(parse_type("Missing"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
+import copy
+import os
+import tempfile
 import unittest
 
-from utils import combine_yamls
+from utils import combine_yamls, write_yaml
 
 
 class CombineYamlsTest(unittest.TestCase):
@@ -27,5 +30,48 @@ class CombineYamlsTest(unittest.TestCase):
         )
 
 
+class WriteYamlTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "code.yml")
+
+    def read(self) -> str:
+        with open(self.path) as f:
+            return f.read()
+
+    def test_field_order(self):
+        data = [{
+            "line": "",
+            "size": 0x10,
+            "addr": {"U": 0x8000100, "J": 0x8000000},
+            "label": "Start",
+            "desc": "Start",
+        }]
+        before = copy.deepcopy(data)
+        self.assertIsNone(write_yaml(self.path, data, "code"))
+        self.assertEqual(self.read(), (
+            "-\n"
+            "  desc: Start\n"
+            "  label: Start\n"
+            "  addr:\n"
+            "    J: 0x8000000\n"
+            "    U: 0x8000100\n"
+            "  size: 0x10\n"
+            "  line: ''\n"
+        ))
+        self.assertEqual(data, before)
+
+    def test_dict_and_empty(self):
+        write_yaml(self.path, {"b": [{"val": 1, "desc": "B"}], "a": []}, "enums")
+        self.assertEqual(self.read(), "a: []\nb:\n- desc: B\n  val: 0x1\n")
+        write_yaml(self.path, [], "code")
+        self.assertEqual(self.read(), "[]\n")
+
+    def test_validate(self):
+        future = write_yaml(self.path, [{"label": "Start"}], "code", validate=True)
+        self.assertIsNone(future.result())
+
+
 if __name__ == "__main__":
     unittest.main()
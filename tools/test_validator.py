@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import utils
+import validator
+from info.info_columns import read_info_columns
+import yaml_loader
+from constants import MAP_CODE, MAP_ENUMS, MAP_STRUCTS
+
+
+CODE = """\
+- desc: Start
+  label: Start
+  addr: 0x8000000
+  size: 0x10
+  mode: thumb
+  params: null
+  return: null
+- desc: ""
+  label: Bad-Label
+  addr: 0x8000004
+  size: 0x10
+  mode: thumb
+  params: null
+  return: null
+- desc: Next
+  label: Next
+  addr: 0x8000008
+  size: 0x10
+  mode: thumb
+  params: null
+  return: null
+"""
+
+
+class ValidatorTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for patcher in (
+            mock.patch.object(utils, "YAML_PATH", tmp.name),
+            mock.patch.object(validator, "VALIDATOR_CACHE_PATH", os.path.join(tmp.name, "cache")),
+            mock.patch.object(yaml_loader, "YAML_CACHE_PATH", os.path.join(tmp.name, "yaml_cache")),
+            mock.patch.object(validator, "GAMES", ("fe6",)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.makedirs(os.path.join(tmp.name, "fe6"))
+        self.code_path = os.path.join(tmp.name, "fe6", "code.yml")
+        self.write_code(CODE)
+        self.checked = []
+        original = validator._validate_map
+
+        def validate_map(game, map_type, *args):
+            self.checked.append(map_type)
+            return original(game, map_type, *args)
+
+        patcher = mock.patch.object(validator, "_validate_map", validate_map)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_code(self, text: str) -> None:
+        with open(self.code_path, "w") as f:
+            f.write(text)
+
+    def validate(self) -> list[validator.ValidationError]:
+        with mock.patch("builtins.print"):
+            return validator.Validator().validate(processes=1)
+
+    def test_collects_all_errors(self):
+        errors = self.validate()
+        messages = [(e.entry, e.message) for e in errors]
+        self.assertEqual(messages, [
+            ("Bad-Label", "desc cannot be empty"),
+            ("Bad-Label", "label must be alphanumeric"),
+            ("Next", "entries overlap"),
+        ])
+        # Maps without files are empty
+        self.assertIn(MAP_ENUMS, self.checked)
+
+    def test_rechecks_changed_maps(self):
+        errors = self.validate()
+        self.checked.clear()
+        self.assertEqual(self.validate(), errors)
+        self.assertEqual(self.checked, [])
+        self.write_code(CODE.replace("Bad-Label", "Fixed"))
+        self.assertEqual(len(self.validate()), 2)
+        self.assertEqual(self.checked, [MAP_CODE])
+        # Structs are checked against enums, so they're rechecked too
+        enums_path = os.path.join(os.path.dirname(self.code_path), "enums.yml")
+        with open(enums_path, "w") as f:
+            f.write("[]\n")
+        self.checked.clear()
+        self.validate()
+        self.assertEqual(sorted(self.checked), sorted(validator.MAP_TYPES))
+        self.assertIn(MAP_STRUCTS, self.checked)
+
+
+class OutputJsonsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.json_dir = os.path.join(tmp.name, "json")
+        for patcher in (
+            mock.patch.object(utils, "YAML_PATH", tmp.name),
+            mock.patch.object(validator, "JSON_PATH", self.json_dir),
+            mock.patch.object(validator, "JSON_MANIFEST_PATH", os.path.join(tmp.name, "manifest.json")),
+            mock.patch.object(yaml_loader, "YAML_CACHE_PATH", os.path.join(tmp.name, "yaml_cache")),
+            mock.patch.object(validator, "GAMES", ("fe6",)),
+            mock.patch("builtins.print"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.makedirs(os.path.join(tmp.name, "fe6"))
+        self.code_path = os.path.join(tmp.name, "fe6", "code.yml")
+        with open(self.code_path, "w") as f:
+            f.write(CODE)
+
+    def build(self) -> list[str]:
+        with mock.patch.object(validator, "_build_json", wraps=validator._build_json) as build:
+            validator.output_jsons(processes=1)
+        return [os.path.basename(call.args[1]) for call in build.call_args_list]
+
+    def test_incremental(self):
+        self.assertEqual(self.build(), ["code.json"])
+        json_path = os.path.join(self.json_dir, "fe6", "code.json")
+        with open(json_path) as f:
+            self.assertEqual(json.load(f)[0]["addr"], "8000000")
+        # Maps without yaml files aren't written
+        self.assertEqual(sorted(os.listdir(os.path.dirname(json_path))), ["code.json", "code.npz"])
+        self.assertEqual(read_info_columns(validator.columns_path(json_path)), json.load(open(json_path)))
+        self.assertEqual(self.build(), [])
+        with open(self.code_path, "a") as f:
+            f.write("# comment\n")
+        self.assertEqual(self.build(), ["code.json"])
+        # Outputs changed by something else are rebuilt
+        with open(json_path, "w") as f:
+            f.write("[]")
+        self.assertEqual(self.build(), ["code.json"])
+        os.remove(validator.columns_path(json_path))
+        self.assertEqual(self.build(), ["code.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
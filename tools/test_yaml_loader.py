@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import yaml_loader
+from yaml_loader import cache_path, load_yaml
+
+
+class LoadYamlTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(yaml_loader, "YAML_CACHE_PATH", os.path.join(tmp.name, "cache"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.path = os.path.join(tmp.name, "code.yml")
+
+    def write(self, text: str) -> None:
+        with open(self.path, "w") as f:
+            f.write(text)
+
+    def test_cached_by_contents(self):
+        self.write("- label: Start\n  addr: 0x8000000\n")
+        expected = [{"label": "Start", "addr": 0x8000000}]
+        self.assertEqual(load_yaml(self.path), expected)
+        with mock.patch.object(yaml_loader, "parse_yaml") as parse:
+            self.assertEqual(load_yaml(self.path), expected)
+            parse.assert_not_called()
+        self.write("- label: Other\n")
+        self.assertEqual(load_yaml(self.path), [{"label": "Other"}])
+
+    def test_reparses_changed_entries(self):
+        self.write("- label: A\n- label: B\n- label: D\n")
+        load_yaml(self.path)
+        self.write("- label: A\n- label: C\n- label: D\n- label: A\n")
+        with mock.patch.object(yaml_loader, "parse_yaml", wraps=yaml_loader.parse_yaml) as parse:
+            data = load_yaml(self.path)
+        self.assertEqual(data, [{"label": l} for l in "ACDA"])
+        # Repeated entries are parsed again rather than shared
+        self.assertEqual(
+            [c.args[0] for c in parse.call_args_list],
+            [b"- label: C\n", b"- label: A\n"]
+        )
+        self.assertIsNot(data[0], data[3])
+
+    def test_one_sidecar_per_file(self):
+        for label in "ABC":
+            self.write(f"- label: {label}\n")
+            load_yaml(self.path)
+        sidecars = os.listdir(yaml_loader.YAML_CACHE_PATH)
+        self.assertEqual(sidecars, [os.path.basename(cache_path(self.path))])
+        self.write("- label: A\n")
+        self.assertEqual(load_yaml(self.path), [{"label": "A"}])
+
+    def test_aliases_across_entries(self):
+        self.write("- &a {label: A}\n- *a\n")
+        self.assertEqual(load_yaml(self.path), [{"label": "A"}, {"label": "A"}])
+
+    def test_safe(self):
+        self.write("!!python/name:os.system\n")
+        with self.assertRaises(Exception):
+            load_yaml(self.path, use_cache=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from enum import Enum, auto
 
 from rom import Rom, ROM_OFFSET
@@ -97,6 +98,39 @@ class Reg(object):
     PC = 15
 
 
+@dataclass(frozen=True)
+class ThumbDecode:
+    """Fields decoded from a single 16-bit encoding, shared between sites."""
+    format: "ThumbForm"
+    opcode: int
+    opname: "ThumbOp"
+    rd: int
+    rs: int
+    rn: int
+    ro: int
+    rlist: tuple[int, ...]
+    # For bl, only the upper 11 bits of the offset
+    imm: int
+
+
+DECODE_TABLE: list[ThumbDecode] = [None] * 0x10000
+
+
+def decode(val: int) -> ThumbDecode:
+    """Returns the decode of a 16-bit encoding, computing it on first use."""
+    dec = DECODE_TABLE[val]
+    if dec is None:
+        dec = ThumbInstruct.decode_halfword(val)
+        DECODE_TABLE[val] = dec
+    return dec
+
+
+def build_decode_table() -> None:
+    """Decodes all 16-bit encodings up front."""
+    for val in range(0x10000):
+        decode(val)
+
+
 class ThumbInstruct(object):
 
     # phys_addr: int
@@ -110,22 +144,48 @@ class ThumbInstruct(object):
     # rlist: list[int]
     # imm: int
 
+    __slots__ = (
+        "phys_addr", "format", "opcode", "opname",
+        "rd", "rs", "rn", "ro", "rlist", "imm"
+    )
+
     def __init__(self, rom: Rom, addr: int):
         self.phys_addr = addr
-        val = rom.read_16(addr)
-        self.set_format(val)
-        self.set_opcode(val)
-        self.set_rd(val)
-        self.set_rs(val)
-        self.set_rn(val)
-        self.set_ro(val)
-        self.set_rlist(val)
+        dec = decode(rom.read_16(addr))
+        self.format = dec.format
+        self.opcode = dec.opcode
+        self.opname = dec.opname
+        self.rd = dec.rd
+        self.rs = dec.rs
+        self.rn = dec.rn
+        self.ro = dec.ro
+        self.rlist = None if dec.rlist is None else list(dec.rlist)
         if self.format == ThumbForm.Link:
             val2 = rom.read_16(addr + 2)
-            self.imm = ((val & 2047) << 11) | (val2 & 2047)
+            self.imm = (dec.imm << 11) | (val2 & 2047)
+        else:
+            self.imm = dec.imm
+
+    @classmethod
+    def decode_halfword(cls, val: int) -> ThumbDecode:
+        inst = cls.__new__(cls)
+        inst.set_format(val)
+        inst.set_opcode(val)
+        inst.set_rd(val)
+        inst.set_rs(val)
+        inst.set_rn(val)
+        inst.set_ro(val)
+        inst.set_rlist(val)
+        if inst.format == ThumbForm.Link:
+            inst.imm = val & 2047
         else:
-            self.set_imm(val)
-        self.set_opname()
+            inst.set_imm(val)
+        inst.set_opname()
+        rlist = None if inst.rlist is None else tuple(inst.rlist)
+        return ThumbDecode(
+            inst.format, inst.opcode, inst.opname,
+            inst.rd, inst.rs, inst.rn, inst.ro, rlist, inst.imm
+        )
 
     def __str__(self) -> str:
         fields = [
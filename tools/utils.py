@@ -1,9 +1,11 @@
+import atexit
+from concurrent.futures import Future, ProcessPoolExecutor
 from functools import cmp_to_key
 import os
-import re
 from typing import Any, Dict, List, Union
 import yaml
 from constants import *
+from yaml_loader import load_yaml
 
 
 TYPE_SIZES = {
@@ -30,24 +32,27 @@ def hexint_presenter(dumper, data):
 yaml.add_representer(int, hexint_presenter)
 
 
-def read_yaml(path: str) -> InfoFile:
-    with open(path) as f:
-        return yaml.full_load(f)
+def read_yaml(path: str, use_cache: bool = True) -> InfoFile:
+    return load_yaml(path, use_cache)
 
 
-def read_yamls(game: str, map_type: str) -> InfoFile:
+def get_yaml_paths(game: str, map_type: str) -> List[str]:
+    """Returns the yaml files holding a map, or an empty list if it has none."""
     dir_path = os.path.join(YAML_PATH, game, map_type)
     file_path = dir_path + YAML_EXT
-    data_dict = None
     if os.path.isfile(file_path):
-        data_dict = {file_path: read_yaml(file_path)}
-    elif os.path.isdir(dir_path):
+        return [file_path]
+    if os.path.isdir(dir_path):
         files = [f for f in os.listdir(dir_path) if f.endswith(YAML_EXT)]
-        files = [os.path.join(dir_path, f) for f in files]
-        data_dict = {f: read_yaml(f) for f in files}
-    else:
+        return [os.path.join(dir_path, f) for f in files]
+    return []
+
+
+def read_yamls(game: str, map_type: str) -> InfoFile:
+    paths = get_yaml_paths(game, map_type)
+    if not paths:
         raise ValueError("No file or directory found")
-    return combine_yamls(list(data_dict.values()))
+    return combine_yamls([read_yaml(p) for p in paths])
 
 
 def combine_yamls(data_list: List[InfoFile]) -> InfoFile:
@@ -100,39 +105,92 @@ def ints_to_strs(data: InfoFile) -> None:
                     stack.append(v)
 
 
-def write_yaml(path: str, data: InfoFile, map_type: str) -> None:
-    # create stack of entries
+class FieldDict(dict):
+    """A mapping whose keys are already in output order."""
+
+
+# libyaml's emitter is much faster and produces the same output
+class YamlDumper(getattr(yaml, "CDumper", yaml.Dumper)):
+    # Entries are dumped one at a time, so anchors couldn't span them
+    def ignore_aliases(self, data: Any) -> bool:
+        return True
+
+
+def represent_field_dict(dumper: yaml.Dumper, data: FieldDict) -> yaml.Node:
+    # Passing items instead of a dict keeps them from being sorted
+    return dumper.represent_mapping("tag:yaml.org,2002:map", list(data.items()))
+
+
+YamlDumper.add_representer(int, hexint_presenter)
+YamlDumper.add_representer(FieldDict, represent_field_dict)
+
+
+def order_fields(entry: Any, key: str) -> Any:
+    """
+    Returns a copy of the entry with the fields listed in FIELDS for the
+    key first, in that order, and the rest after them in sorted order.
+    """
+    if isinstance(entry, dict):
+        fields = FIELDS[key]
+        ordered = FieldDict()
+        for field in fields:
+            if field in entry:
+                ordered[field] = order_fields(entry[field], field)
+        for k in sorted(entry):
+            if k not in ordered:
+                ordered[k] = entry[k]
+        return ordered
+    if isinstance(entry, list):
+        return [order_fields(e, key) for e in entry]
+    return entry
+
+
+def check_yaml_file(path: str) -> None:
+    """Parses a yaml file to make sure it's valid."""
+    load_yaml(path, use_cache=False)
+
+
+_check_executor: ProcessPoolExecutor = None
+
+
+def write_yaml(
+    path: str,
+    data: InfoFile,
+    map_type: str,
+    validate: bool = False
+) -> Future:
+    """
+    Writes the entries of an info file to a yaml file one at a time,
+    with their fields in FIELDS order. The data is left unchanged.
+    If validate is set, the written file is parsed in a worker process
+    (shared by every call and shut down at exit), and the returned future
+    raises if it's invalid.
+    """
     if isinstance(data, dict):
-        stack = [(v, map_type) for v in data.values()]
+        items = ({k: order_fields(data[k], map_type)} for k in sorted(data))
     elif isinstance(data, list):
-        stack = [(d, map_type) for d in data]
+        items = ([order_fields(d, map_type)] for d in data)
     else:
         raise ValueError("Bad format")
-    # check for required fields
-    while len(stack) > 0:
-        entry, k = stack.pop()
-        if isinstance(entry, dict):
-            fields = FIELDS[k]
-            for i, field in enumerate(fields):
-                if field in entry:
-                    v = entry.pop(field)
-                    # add index to keep fields in order
-                    entry[f"{i:03}~{field}"] = v
-                    stack.append((v, field))
-        elif isinstance(entry, list):
-            stack += [(e, k) for e in entry]
-
-    # get output
-    output = yaml.dump(data)
-    # remove index from fields
-    output = re.sub(r"\d+~", "", output)
-    if isinstance(data, list):
-        # add extra line breaks for lists
-        output = re.sub(r"^- ", "-\n  ", output, flags=re.MULTILINE)
-    # try parsing output to make sure it's valid
-    yaml.full_load(output)
-    with open(path, "w") as f:
-        f.write(output)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        if len(data) == 0:
+            f.write(yaml.dump(data))
+        for item in items:
+            output = yaml.dump(item, Dumper=YamlDumper)
+            if isinstance(data, list) and output.startswith("- "):
+                # add extra line breaks for lists
+                output = "-\n  " + output[2:]
+            f.write(output)
+    os.replace(tmp_path, path)
+    if not validate:
+        return None
+    global _check_executor
+    if _check_executor is None:
+        _check_executor = ProcessPoolExecutor(max_workers=1)
+        # Waits for pending checks, so their results aren't lost at exit
+        atexit.register(_check_executor.shutdown)
+    return _check_executor.submit(check_yaml_file, path)
 
 
 def get_type_size(entry: Dict[str, Any], structs: Dict[str, Any]) -> int:
@@ -1,88 +1,246 @@
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
 import json
 import os
 import re
+from typing import Any, NamedTuple
 from constants import *
-from utils import get_entry_size, ints_to_strs, read_yaml, read_yamls, write_yaml
+from info.info_columns import INFO_COLUMNS_VERSION, write_info_columns
+from utils import (
+    InfoFile, combine_yamls, get_entry_size, get_yaml_paths, ints_to_strs,
+    read_yaml, write_yaml
+)
 
 
 LABEL_PAT = re.compile(r"^\w+$")
+# Bump when checks change so cached results are discarded
+VALIDATOR_VERSION = 1
+VALIDATOR_CACHE_PATH = os.path.join(CACHE_PATH, "validator")
+# Bump when the json output format changes so every file is rebuilt
+JSON_MANIFEST_VERSION = 3
+JSON_MANIFEST_PATH = os.path.join(CACHE_PATH, "json", "manifest.json")
+# Maps whose checks depend on each map type's data
+MAP_CONTEXT = {
+    MAP_ENUMS: (),
+    MAP_STRUCTS: (MAP_ENUMS,),
+    MAP_CODE: (MAP_ENUMS, MAP_STRUCTS),
+    MAP_DATA: (MAP_ENUMS, MAP_STRUCTS),
+    MAP_RAM: (MAP_ENUMS, MAP_STRUCTS),
+}
+
+YamlFiles = list[tuple[str, str]]
+
+
+class ValidationError(NamedTuple):
+    game: str
+    map_type: str
+    entry: str
+    message: str
+
+
+def file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_map(files: YamlFiles, use_cache: bool = True) -> InfoFile:
+    """Reads and combines a map's files. A map without files is empty."""
+    if not files:
+        return []
+    return combine_yamls([read_yaml(p, use_cache) for p, _ in files])
+
+
+def by_label(data: InfoFile) -> dict[str, Any]:
+    """Keys enums and structs by name, accepting a list of labeled entries."""
+    if isinstance(data, dict):
+        return data
+    named = {}
+    for entry in data:
+        entry = dict(entry)
+        label = entry.pop("label", None)
+        named[label] = entry.get("vals", entry)
+    return named
+
+
+def _validate_map(
+    game: str,
+    map_type: str,
+    files: YamlFiles,
+    context: dict[str, YamlFiles],
+    use_cache: bool
+) -> list[ValidationError]:
+    v = Validator(game)
+    if MAP_ENUMS in context:
+        v.enums = by_label(read_map(context[MAP_ENUMS], use_cache))
+    if MAP_STRUCTS in context:
+        v.structs = by_label(read_map(context[MAP_STRUCTS], use_cache))
+    v.check_map(map_type, read_map(files, use_cache))
+    return v.errors
 
 
 class Validator(object):
-    def __init__(self):
-        self.game = None
+    def __init__(self, game: str = None):
+        self.game = game
         self.map_type = None
-        self.entry = None
-        self.enums = None
-        self.structs = None
+        self.enums = {}
+        self.structs = {}
+        self.errors: list[ValidationError] = []
+
+    def run_checks(self, name: str, *checks) -> bool:
+        """
+        Runs every check on an entry, recording each failure.
+        Returns true if all of them passed.
+        """
+        ok = True
+        for check in checks:
+            try:
+                check()
+            except AssertionError as e:
+                self.errors.append(ValidationError(self.game, self.map_type, name, str(e)))
+                ok = False
+            except (KeyError, TypeError, AttributeError, ValueError) as e:
+                # Malformed entries shouldn't stop the rest from being checked
+                message = f"malformed entry ({type(e).__name__}: {e})"
+                self.errors.append(ValidationError(self.game, self.map_type, name, message))
+                ok = False
+        return ok
+
+    def check_map(self, map_type: str, data: InfoFile) -> None:
+        """Checks every entry of a map, collecting all errors."""
+        self.map_type = map_type
+        if map_type == MAP_ENUMS:
+            for key, vals in by_label(data).items():
+                self.run_checks(
+                    key,
+                    lambda: self.check_name(key, "enum"),
+                    lambda: self.check_vals(vals)
+                )
+        elif map_type == MAP_STRUCTS:
+            for key, st in by_label(data).items():
+                self.run_checks(
+                    key,
+                    lambda: self.check_name(key, "struct"),
+                    lambda: self.check_size(st, True),
+                    lambda: self.check_vars(st)
+                )
+        elif map_type == MAP_CODE:
+            last = {r: 0 for r in REGIONS}
+            for i, entry in enumerate(data):
+                name = entry.get("label", str(i)) if isinstance(entry, dict) else str(i)
+                # Overlap needs a valid address and size
+                if self.run_checks(
+                    name,
+                    lambda: self.check_desc(entry),
+                    lambda: self.check_label(entry),
+                    lambda: self.check_addr(entry, 4),
+                    lambda: self.check_size(entry, True, 2),
+                    lambda: self.check_mode(entry),
+                    lambda: self.check_params(entry),
+                    lambda: self.check_return(entry)
+                ):
+                    self.run_checks(name, lambda: self.check_overlap(entry, last))
+        else:
+            # Data and ram
+            last = {r: 0 for r in REGIONS}
+            for i, entry in enumerate(data):
+                name = entry.get("label", str(i)) if isinstance(entry, dict) else str(i)
+                if self.run_checks(
+                    name,
+                    lambda: self.check_desc(entry),
+                    lambda: self.check_label(entry),
+                    # TODO: should type be required?
+                    lambda: self.check_type(entry),
+                    # TODO: check if address is aligned with type
+                    lambda: self.check_addr(entry),
+                    lambda: self.check_count(entry),
+                    lambda: self.check_size(entry, "type" not in entry),
+                    lambda: self.check_enum(entry)
+                ):
+                    self.run_checks(name, lambda: self.check_overlap(entry, last))
+
+    def validate(self, processes: int = None, use_cache: bool = True) -> list[ValidationError]:
+        """
+        Validates every map of every game in worker processes and prints
+        all errors found. Maps whose files (and the enums and structs they
+        are checked against) are unchanged since the last run reuse the
+        previous results.
+        """
+        # Hashing is much cheaper than parsing, so digest everything up front
+        files = {
+            (game, map_type): [(p, file_digest(p)) for p in sorted(get_yaml_paths(game, map_type))]
+            for game in GAMES
+            for map_type in MAP_TYPES
+        }
+        keys = {}
+        for (game, map_type), map_files in files.items():
+            h = hashlib.sha256(f"{VALIDATOR_VERSION} {game} {map_type}".encode())
+            for context_type in (map_type, *MAP_CONTEXT[map_type]):
+                for path, digest in files[(game, context_type)]:
+                    h.update(f" {context_type} {path} {digest}".encode())
+            keys[(game, map_type)] = h.hexdigest()
+
+        index_path = os.path.join(VALIDATOR_CACHE_PATH, "index.json")
+        cached = {}
+        if use_cache:
+            try:
+                with open(index_path) as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+        results: dict[tuple[str, str], list[ValidationError]] = {}
+        todo = []
+        for unit, key in keys.items():
+            entry = cached.get("/".join(unit))
+            if entry is not None and entry["key"] == key:
+                results[unit] = [ValidationError(*e) for e in entry["errors"]]
+            else:
+                todo.append(unit)
+
+        def task(unit):
+            game, map_type = unit
+            context = {t: files[(game, t)] for t in MAP_CONTEXT[map_type]}
+            return (_validate_map, game, map_type, files[unit], context, use_cache)
+
+        # Enums and structs go first so their parses are cached for the
+        # maps checked against them
+        first = [u for u in todo if u[1] in (MAP_ENUMS, MAP_STRUCTS)]
+        rest = [u for u in todo if u not in first]
+        if processes == 1:
+            for unit in first + rest:
+                fn, *args = task(unit)
+                results[unit] = fn(*args)
+        elif todo:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                for units in (first, rest):
+                    futures = {u: executor.submit(*task(u)) for u in units}
+                    for unit, future in futures.items():
+                        results[unit] = future.result()
+
+        if use_cache:
+            os.makedirs(VALIDATOR_CACHE_PATH, exist_ok=True)
+            index = {
+                "/".join(unit): {"key": keys[unit], "errors": results[unit]}
+                for unit in keys
+            }
+            tmp_path = index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, index_path)
+
+        errors = [e for unit in keys for e in results[unit]]
+        for e in errors:
+            print(f"{e.game} {e.map_type} {e.entry}: {e.message}")
+        if errors:
+            print(f"{len(errors)} validation errors")
+        else:
+            print("No validation errors")
+        return errors
 
-    def validate(self):
-        try:
-            for game in GAMES:
-                self.game = game
-                # get all info
-                infos = [read_yamls(game, map_type) for map_type in MAP_TYPES]
-                code, data, enums, ram, structs = infos
-                self.enums = enums
-                self.structs = structs
-
-                # check enums
-                self.map_type = MAP_ENUMS
-                for key, vals in enums.items():
-                    self.entry = key
-                    assert LABEL_PAT.match(
-                        key), "enum name must be alphanumeric"
-                    self.check_vals(vals)
-
-                # check structs
-                self.map_type = "structs"
-                for key, st in structs.items():
-                    self.entry = key
-                    assert LABEL_PAT.match(
-                        key), "struct name must be alphanumeric"
-                    self.check_size(st, True)
-                    self.check_vars(st)
-
-                # check code
-                self.map_type = MAP_CODE
-                last = {r: 0 for r in REGIONS}
-                for entry in code:
-                    self.entry = entry
-                    self.check_desc(entry)
-                    self.check_label(entry)
-                    self.check_addr(entry, 4)
-                    self.check_size(entry, True, 2)
-                    self.check_mode(entry)
-                    self.check_params(entry)
-                    self.check_return(entry)
-                    self.check_overlap(entry, last)
-
-                # check data and ram
-                ram_rom = [(MAP_DATA, data), (MAP_RAM, ram)]
-                for map_type, entries in ram_rom:
-                    self.map_type = map_type
-                    last = {r: 0 for r in REGIONS}
-                    for entry in entries:
-                        self.entry = entry
-                        self.check_desc(entry)
-                        self.check_label(entry)
-                        # TODO: should type be required?
-                        self.check_type(entry)
-                        # TODO: check if address is aligned with type
-                        self.check_addr(entry)
-                        self.check_count(entry)
-                        size_req = "type" not in entry
-                        self.check_size(entry, size_req)
-                        self.check_enum(entry)
-                        self.check_overlap(entry, last)
-
-        except AssertionError as e:
-            print(self.game, self.map_type)
-            print(self.entry)
-            print(e)
-            return
-        print("No validation errors")
+    def check_name(self, name: str, kind: str) -> None:
+        assert isinstance(name, str) and LABEL_PAT.match(name), \
+            f"{kind} name must be alphanumeric"
 
     def check_overlap(self, entry, last) -> None:
         addr = entry["addr"]
@@ -234,17 +392,98 @@ def output_yamls() -> None:
     print("Output YAML files")
 
 
-def output_jsons() -> None:
+def columns_path(json_path: str) -> str:
+    return os.path.splitext(json_path)[0] + COLUMNS_EXT
+
+
+def _build_json(paths: list[str], json_path: str) -> dict[str, str]:
+    """
+    Converts a map's yaml files to json, along with its columnar export,
+    and returns the digest of each output.
+    """
+    data = combine_yamls([read_yaml(p) for p in paths])
+    ints_to_strs(data)
+    output = json.dumps(data).encode()
+    os.makedirs(os.path.dirname(json_path), exist_ok=True)
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(output)
+    os.replace(tmp_path, json_path)
+    digests = {"output": hashlib.sha256(output).hexdigest()}
+    # Only lists of entries can be stored as columns
+    if isinstance(data, list) and all(isinstance(e, dict) for e in data):
+        write_info_columns(columns_path(json_path), data)
+        digests["columns"] = file_digest(columns_path(json_path))
+    return digests
+
+
+def output_jsons(processes: int = None, force: bool = False) -> None:
+    """
+    Converts each map's yaml to json and its columnar export. Outputs
+    whose yaml files and contents are unchanged since the last build
+    (per the manifest) are skipped, and maps without yaml files are
+    left alone.
+    """
+    manifest = {}
+    if not force:
+        try:
+            with open(JSON_MANIFEST_PATH) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+        # Columnar exports in an older format are rebuilt as well
+        if (
+            manifest.get("version") != JSON_MANIFEST_VERSION
+            or manifest.get("columns_version") != INFO_COLUMNS_VERSION
+        ):
+            manifest = {}
+    outputs = manifest.get("outputs", {})
+
+    todo = {}
     for game in GAMES:
         json_dir = os.path.join(JSON_PATH, game)
-        # convert each to json
         for map_type in MAP_TYPES:
-            data = read_yamls(game, map_type)
-            ints_to_strs(data)
-            p = os.path.join(json_dir, map_type + JSON_EXT)
-            with open(p, "w") as f:
-                json.dump(data, f)
-    print("Output JSON files")
+            paths = get_yaml_paths(game, map_type)
+            if not paths:
+                continue
+            json_path = os.path.join(json_dir, map_type + JSON_EXT)
+            inputs = {p: file_digest(p) for p in paths}
+            built = outputs.get(json_path)
+            if (
+                built is not None
+                and built["inputs"] == inputs
+                and os.path.isfile(json_path)
+                and file_digest(json_path) == built["output"]
+                and (
+                    "columns" not in built
+                    or os.path.isfile(columns_path(json_path))
+                    and file_digest(columns_path(json_path)) == built["columns"]
+                )
+            ):
+                continue
+            todo[json_path] = (paths, inputs)
+
+    # Starting workers costs more than a single small rebuild
+    if processes == 1 or len(todo) <= 1:
+        digests = {p: _build_json(paths, p) for p, (paths, _) in todo.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {p: executor.submit(_build_json, paths, p) for p, (paths, _) in todo.items()}
+            digests = {p: future.result() for p, future in futures.items()}
+
+    for json_path, (_, inputs) in todo.items():
+        outputs[json_path] = {"inputs": inputs, **digests[json_path]}
+    if todo or force:
+        os.makedirs(os.path.dirname(JSON_MANIFEST_PATH), exist_ok=True)
+        tmp_path = JSON_MANIFEST_PATH + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "version": JSON_MANIFEST_VERSION,
+                "columns_version": INFO_COLUMNS_VERSION,
+                "outputs": outputs
+            }, f, indent=1)
+        os.replace(tmp_path, JSON_MANIFEST_PATH)
+    print(f"Output JSON files ({len(todo)} rebuilt)")
 
 
 if __name__ == "__main__":
@@ -252,13 +491,17 @@ if __name__ == "__main__":
     parser.add_argument("-v", "--validate", action="store_true")
     parser.add_argument("-y", "--yaml", action="store_true")
     parser.add_argument("-j", "--json", action="store_true")
+    parser.add_argument("-p", "--processes", type=int,
+        help="Number of worker processes")
+    parser.add_argument("--no-cache", action="store_true",
+        help="Re-check and rebuild every file")
     args = parser.parse_args()
 
     if args.validate:
         v = Validator()
-        v.validate()
+        v.validate(args.processes, not args.no_cache)
     if args.yaml:
         output_yamls()
     if args.json:
-        output_jsons()
+        output_jsons(args.processes, args.no_cache)
     print("Done")
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import pickle
+import re
+from typing import Any
+
+import yaml
+
+from constants import CACHE_PATH
+
+
+# libyaml's loader is several times faster; fall back if PyYAML lacks it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+# Bump to ignore sidecars written by an older loader
+YAML_CACHE_VERSION = 2
+YAML_CACHE_PATH = os.path.join(CACHE_PATH, "yaml")
+
+# Items of a top level block sequence start at column 0
+ITEM_PAT = re.compile(rb"^-(?=[ \r\n])", re.MULTILINE)
+MARKER_PAT = re.compile(rb"^(---|\.\.\.)", re.MULTILINE)
+
+
+def parse_yaml(text: str | bytes) -> Any:
+    return yaml.load(text, Loader=YAML_LOADER)
+
+
+def split_entries(raw: bytes) -> list[bytes]:
+    """
+    Splits the text of a yaml file holding a top level list into the text
+    of each entry. Returns None if the file isn't one that can be split.
+    """
+    starts = [m.start() for m in ITEM_PAT.finditer(raw)]
+    if not starts or MARKER_PAT.search(raw):
+        return None
+    # Only blank lines and comments may come before the first entry
+    for line in raw[:starts[0]].splitlines():
+        if line.strip() and not line.lstrip().startswith(b"#"):
+            return None
+    starts.append(len(raw))
+    return [raw[a:b] for a, b in zip(starts, starts[1:])]
+
+
+def _write_pickle(path: str, obj: Any) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique per process, since workers may parse the same file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _read_pickle(path: str) -> Any:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _load_entries(raw: bytes, prev: dict[bytes, Any]) -> tuple[list[Any], dict[bytes, Any]]:
+    """
+    Parses a top level list one entry at a time, reusing the entries in
+    prev (entry text -> parsed entry) left unchanged since the file was
+    last loaded. Returns the entries and the cache to save for the next
+    load, or None if the file can't be parsed this way.
+    """
+    chunks = split_entries(raw)
+    if chunks is None:
+        return None
+    entries = []
+    cache = {}
+    for chunk in chunks:
+        # Each cached object is only handed out once
+        entry = prev.pop(chunk, prev)
+        if entry is prev:
+            try:
+                parsed = parse_yaml(chunk)
+            except yaml.YAMLError:
+                # e.g. an alias to an anchor in another entry
+                return None
+            if not isinstance(parsed, list) or len(parsed) != 1:
+                return None
+            entry = parsed[0]
+        cache[chunk] = entry
+        entries.append(entry)
+    return entries, cache
+
+
+def cache_path(path: str) -> str:
+    """Returns the sidecar of a yaml file, which is replaced on each change."""
+    path_key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(YAML_CACHE_PATH, path_key + ".pickle")
+
+
+def load_yaml(path: str, use_cache: bool = True) -> Any:
+    """
+    Loads a yaml file and returns a python object. The parsed object is
+    saved in a sidecar along with the digest of the file's contents, so
+    unchanged files are only parsed once. When a file holding a list
+    changes, only the entries that changed are parsed again. Each file
+    has a single sidecar, overwritten whenever the file changes.
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+    if not use_cache:
+        return parse_yaml(raw)
+    digest = hashlib.sha256(raw).hexdigest()
+    sidecar_path = cache_path(path)
+    cached = _read_pickle(sidecar_path)
+    prev = {}
+    if isinstance(cached, dict) and cached.get("version") == YAML_CACHE_VERSION:
+        if cached["digest"] == digest:
+            return cached["data"]
+        prev = cached["entries"]
+    loaded = _load_entries(raw, prev)
+    if loaded is not None:
+        data, entries = loaded
+    else:
+        data = parse_yaml(raw)
+        entries = {}
+    # Entries share their objects with data, so they're only pickled once
+    _write_pickle(sidecar_path, {
+        "version": YAML_CACHE_VERSION,
+        "digest": digest,
+        "data": data,
+        "entries": entries
+    })
+    return data